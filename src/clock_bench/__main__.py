@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from .cpu import cpu_seconds
+from .load import run_clients
+from .report import merge, summarize
+
+SERVER_IP = "127.0.0.1"
+SERVER_PORT = 10010
+CLIENTS = 1000
+PROCESSES = 4
+DURATION_SECONDS = 30.0
+RAMP_SECONDS = 1.0
+# Time allowed for the load generator processes to open their sockets
+SETUP_SECONDS = 1.0
+# Time allowed for a server started by the benchmark to open its socket
+SERVER_STARTUP_SECONDS = 1.0
+SERVER_STOP_TIMEOUT = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cli():
+    """ Parses and validates command line arguments """
+    parser = argparse.ArgumentParser()
+    parser.prog = "clock_bench"
+    parser.add_argument("-s", "--server", type=str, default=SERVER_IP, help="IP address of the server")
+    parser.add_argument("-p", "--port", type=int, default=SERVER_PORT, help="UDP port of the server")
+    parser.add_argument("-i", "--interface", type=str, default=SERVER_IP,
+                        help="address of the local network interface for the simulated clients")
+    parser.add_argument("-c", "--clients", type=int, default=CLIENTS, help="total number of simulated clients")
+    parser.add_argument("-P", "--processes", type=int, default=PROCESSES,
+                        help="number of load generator processes over which the clients are spread")
+    parser.add_argument("-t", "--duration", type=float, default=DURATION_SECONDS,
+                        help="length of the measurement in seconds")
+    parser.add_argument("--ramp", type=float, default=RAMP_SECONDS,
+                        help="period in seconds over which the clients' first HELLOs are spread")
+    parser.add_argument("--hello-interval", type=float, default=None,
+                        help="interval between HELLOs from each client; half of the server's dead interval by default")
+    parser.add_argument("--server-pid", type=int, default=None,
+                        help="PID of the server, whose CPU time (including its worker processes) is measured")
+    parser.add_argument("--spawn", type=str, default=None, metavar="SERVER_ARGS",
+                        help="start a server (python -m clock_server) with these extra arguments for the run, "
+                             "and measure its CPU time")
+    parser.add_argument("-o", "--output", type=str, default=None, help="path of the JSON results file")
+    parser.add_argument("-D", "--debug", action="store_true", help="enable debug logging")
+    return parser.parse_args()
+
+
+def spawn_server(args, directory: str) -> subprocess.Popen:
+    """ Starts a clock server on the benchmark's address, with a scratch subscriber database """
+    command = [sys.executable, "-m", "clock_server", "-i", args.server, "-p", str(args.port)]
+    command += shlex.split(args.spawn) + [os.path.join(directory, "subscribers.json")]
+    logger.info(f"starting server: {' '.join(command)}")
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(SERVER_STARTUP_SECONDS)
+    if server.poll() is not None:
+        raise RuntimeError(f"server exited with status {server.returncode}")
+    return server
+
+
+def stop_server(server: subprocess.Popen):
+    """ Interrupts a server started by the benchmark and waits for it to exit """
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(SERVER_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def sample_cpu(pid: int):
+    """ Gets the CPU time of the server; None if it can't be measured """
+    if pid is None:
+        return None
+    try:
+        return cpu_seconds(pid)
+    except OSError as err:
+        logger.warning(f"can't measure server CPU time: {err}")
+        return None
+
+
+def run(args, server_pid: int) -> dict:
+    """ Runs the simulated clients in several processes and summarizes the results """
+    processes = max(1, min(args.processes, args.clients))
+    shares = [args.clients // processes + (1 if i < args.clients % processes else 0) for i in range(processes)]
+    start = time.monotonic() + SETUP_SECONDS
+    with multiprocessing.Pool(processes) as pool:
+        pending = pool.starmap_async(run_clients, [
+            ((args.server, args.port), share, args.interface, args.hello_interval, args.ramp, start, args.duration)
+            for share in shares])
+        time.sleep(max(0.0, start - time.monotonic()))
+        cpu_start = sample_cpu(server_pid)
+        results = pending.get()
+        cpu_end = sample_cpu(server_pid)
+
+    cpu = cpu_end - cpu_start if cpu_start is not None and cpu_end is not None else None
+    summary = {
+        "config": {
+            "server": [args.server, args.port],
+            "clients": args.clients,
+            "processes": processes,
+            "duration": args.duration,
+            "ramp": args.ramp,
+            "hello_interval": args.hello_interval,
+            "server_args": args.spawn,
+        },
+    }
+    summary.update(summarize(merge(results), args.clients, args.duration, cpu))
+    return summary
+
+
+def print_summary(summary: dict):
+    """ Prints the headline figures of a benchmark run """
+    hello, broadcast = summary["hello"], summary["broadcast"]
+    latency = hello["latency_ms"] or {}
+    jitter = broadcast["jitter_ms"] or {}
+    spread = broadcast["spread_ms"] or {}
+    print(f"clients              {summary['config']['clients']}")
+    print(f"HELLO replies        {hello['replies']}/{hello['sent']}")
+    print(f"HELLO latency (ms)   p50 {latency.get('p50', 0):.3f}  p99 {latency.get('p99', 0):.3f}  "
+          f"max {latency.get('max', 0):.3f}")
+    print(f"broadcasts           {broadcast['datagrams']} in {broadcast['rounds']} rounds")
+    print(f"jitter (ms)          p50 {jitter.get('p50', 0):.3f}  p99 {jitter.get('p99', 0):.3f}")
+    print(f"spread (ms)          p50 {spread.get('p50', 0):.3f}  p99 {spread.get('p99', 0):.3f}")
+    print(f"pps                  sent {summary['pps']['sent']:.0f}  received {summary['pps']['received']:.0f}")
+    if summary["server_cpu"]:
+        cpu = summary["server_cpu"]
+        print(f"server CPU           {cpu['utilization'] * 100:.1f}%  "
+              f"{cpu['us_per_subscriber_second']:.2f} us/subscriber/s")
+
+
+if __name__ == "__main__":
+    args = parse_cli()
+    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG if args.debug else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(processName)s %(message)s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = spawn_server(args, directory) if args.spawn is not None else None
+        try:
+            summary = run(args, server.pid if server else args.server_pid)
+        finally:
+            if server:
+                stop_server(server)
+
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(summary, output_file, indent=2)
+        logger.info(f"results written to {args.output}")
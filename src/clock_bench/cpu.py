@@ -0,0 +1,70 @@
+import logging
+import os
+
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROC = "/proc"
+
+
+def _read_stat(pid: int) -> Tuple[int, float]:
+    """ Reads the parent PID and the CPU time (user + system, in seconds) of a process from procfs """
+    with open(os.path.join(PROC, str(pid), "stat"), "r") as stat_file:
+        stat = stat_file.read()
+    # the command name is in parentheses and may itself contain spaces or parentheses
+    fields = stat[stat.rindex(")") + 2:].split()
+    utime, stime = int(fields[11]), int(fields[12])
+    return int(fields[1]), (utime + stime) / os.sysconf("SC_CLK_TCK")
+
+
+def process_tree(pid: int) -> List[int]:
+    """ Lists a process and all of its descendants (e.g. the workers of a multi-process server).
+
+    Args:
+        pid (int): PID of the root process
+
+    Returns:
+        List[int]: the PIDs of the process tree; empty if the process doesn't exist
+    """
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir(PROC):
+        if entry.isdigit():
+            try:
+                parent, _ = _read_stat(int(entry))
+            except (OSError, ValueError, IndexError):
+                continue    # exited while the table was being read
+            children.setdefault(parent, []).append(int(entry))
+
+    if not os.path.exists(os.path.join(PROC, str(pid))):
+        return []
+    tree = [pid]
+    for parent in tree:
+        tree.extend(children.get(parent, ()))
+    return tree
+
+
+def cpu_seconds(pid: int) -> float:
+    """ Gets the total CPU time used by a process and its descendants.
+
+    Args:
+        pid (int): PID of the root process
+
+    Returns:
+        float: CPU time in seconds (user + system)
+
+    Raises:
+        OSError: if procfs is unavailable or the process doesn't exist
+    """
+    if not os.path.isdir(PROC):
+        raise OSError(f"{PROC} is not available on this platform")
+    total = 0.0
+    tree = process_tree(pid)
+    if not tree:
+        raise OSError(f"no such process: {pid}")
+    for member in tree:
+        try:
+            total += _read_stat(member)[1]
+        except (OSError, ValueError, IndexError):
+            logger.debug(f"process {member} exited while sampling CPU time")
+    return total
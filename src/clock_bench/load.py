@@ -0,0 +1,186 @@
+import heapq
+import logging
+import resource
+import selectors
+import socket
+import time
+
+from typing import Dict, List, Optional
+
+from clock_protocol.tlv import HelloField, TimeField, encode_hello, read_fields
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = 512
+# Interval between HELLOs until the server has announced its dead interval
+DEFAULT_HELLO_INTERVAL = 10.0
+# File descriptors kept in reserve beyond the simulated clients' sockets
+RESERVED_DESCRIPTORS = 64
+
+
+class SimulatedClient:
+    """ The state of one simulated client: a UDP socket that subscribes to the server
+        and records when its HELLOs are answered and when broadcasts arrive.
+    """
+
+    __slots__ = ("sock", "hello_sent", "next_hello", "last_broadcast")
+
+    def __init__(self, sock: socket.socket, first_hello: float):
+        self.sock = sock
+        self.hello_sent: Optional[float] = None
+        self.next_hello = first_hello
+        self.last_broadcast: Optional[float] = None
+
+
+def _raise_descriptor_limit(count: int):
+    """ Raises the soft limit on open files so that the given number of sockets can be opened """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = count + RESERVED_DESCRIPTORS
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+
+
+class LoadGenerator:
+    """ Simulates many clock clients from a single process.
+        Each client has its own UDP socket; all of the sockets are serviced by a single
+        selector. Clients subscribe with the client's HELLO message, renew their
+        subscription at a fraction of the dead interval announced by the server, and
+        record the latency of each HELLO reply and the arrival time of each broadcast.
+    """
+
+    def __init__(self, server_address: tuple, clients: int, local_ip: str = "127.0.0.1",
+                 hello_interval: float = None, ramp: float = 1.0):
+        """ Initializes a load generator.
+
+        Args:
+            server_address (tuple): the server's IP address and port
+            clients (int): number of clients to simulate
+            local_ip (str, optional): local address for the clients' sockets
+            hello_interval (float, optional): interval between HELLOs from each client;
+                half of the server's dead interval if not specified
+            ramp (float, optional): period (in seconds) over which the clients' first
+                HELLOs are spread
+        """
+        self.server_address = server_address
+        self.clients = clients
+        self.local_ip = local_ip
+        self.hello_interval = hello_interval
+        self.ramp = ramp
+        self._hello = encode_hello()
+
+    def _open_clients(self, start: float) -> List[SimulatedClient]:
+        _raise_descriptor_limit(self.clients)
+        clients = []
+        for i in range(self.clients):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            sock.bind((self.local_ip, 0))
+            clients.append(SimulatedClient(sock, start + self.ramp * i / self.clients))
+        return clients
+
+    def run(self, start: float, duration: float) -> Dict:
+        """ Runs the simulated clients.
+
+        Args:
+            start (float): monotonic time at which the first client sends its first HELLO
+            duration (float): how long (in seconds) the clients run after the start time
+
+        Returns:
+            Dict: the raw results; counts of datagrams sent and received, the latency of
+                each HELLO reply, the intervals between successive broadcasts received by
+                each client, and the first and last arrival time and the number of clients
+                reached for each broadcast (identified by its TIME field)
+        """
+        clients = self._open_clients(start)
+        selector = selectors.DefaultSelector()
+        for client in clients:
+            selector.register(client.sock, selectors.EVENT_READ, client)
+
+        hello_interval = self.hello_interval or DEFAULT_HELLO_INTERVAL
+        results = {
+            "hellos_sent": 0, "send_errors": 0, "replies": 0, "lost_replies": 0,
+            "broadcasts": 0, "receive_errors": 0, "invalid": 0,
+            "latencies": [], "intervals": [], "rounds": {},
+        }
+        latencies = results["latencies"]
+        intervals = results["intervals"]
+        rounds = results["rounds"]
+        end = start + duration
+        # HELLO deadlines, as (time, client index) pairs
+        deadlines = [(client.next_hello, i) for i, client in enumerate(clients)]
+        heapq.heapify(deadlines)
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= end:
+                    break
+                while deadlines and deadlines[0][0] <= now:
+                    _, i = heapq.heappop(deadlines)
+                    client = clients[i]
+                    if client.hello_sent is not None:
+                        results["lost_replies"] += 1
+                    try:
+                        client.hello_sent = time.monotonic()
+                        client.sock.sendto(self._hello, self.server_address)
+                        results["hellos_sent"] += 1
+                    except OSError:
+                        client.hello_sent = None
+                        results["send_errors"] += 1
+                    client.next_hello = now + hello_interval
+                    heapq.heappush(deadlines, (client.next_hello, i))
+
+                timeout = min(end, deadlines[0][0]) - time.monotonic() if deadlines else end - now
+                for key, _ in selector.select(max(0.0, timeout)):
+                    client = key.data
+                    while True:
+                        try:
+                            data = client.sock.recv(BUFFER_SIZE)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except OSError:
+                            # e.g. an ICMP port unreachable while the server is down
+                            results["receive_errors"] += 1
+                            break
+                        arrival = time.monotonic()
+                        hello, tick = None, None
+                        try:
+                            for field in read_fields(data):
+                                if isinstance(field, HelloField):
+                                    hello = field
+                                elif isinstance(field, TimeField):
+                                    tick = field
+                        except ValueError:
+                            results["invalid"] += 1
+                            continue
+                        if hello is not None:
+                            if client.hello_sent is not None:
+                                latencies.append(arrival - client.hello_sent)
+                                client.hello_sent = None
+                                results["replies"] += 1
+                            if self.hello_interval is None and hello.dead_interval:
+                                hello_interval = hello.dead_interval / 2
+                        elif tick is not None:
+                            results["broadcasts"] += 1
+                            if client.last_broadcast is not None:
+                                intervals.append(arrival - client.last_broadcast)
+                            client.last_broadcast = arrival
+                            label = f"{tick.hour:02}:{tick.minute:02}:{tick.second:02}.{tick.centi:02}"
+                            arrivals = rounds.get(label)
+                            if arrivals is None:
+                                rounds[label] = [arrival, arrival, 1]
+                            else:
+                                arrivals[1] = arrival
+                                arrivals[2] += 1
+        finally:
+            selector.close()
+            for client in clients:
+                client.sock.close()
+        return results
+
+
+def run_clients(server_address: tuple, clients: int, local_ip: str, hello_interval: Optional[float],
+                ramp: float, start: float, duration: float) -> Dict:
+    """ Entry point of a load generator process; see LoadGenerator.run """
+    generator = LoadGenerator(server_address, clients, local_ip, hello_interval, ramp)
+    return generator.run(start, duration)
@@ -0,0 +1,86 @@
+""" Benchmark of the server's HELLO handling throughput in each logging mode.
+
+    Feeds HELLOs directly to ClockServer.handle_input (replies are sent over loopback
+    to a set of sink sockets) and reports the datagrams handled per second, with log
+    records written to the null device. The "unthrottled" mode logs every record on
+    the per-packet paths with no rate limit, which approximates the server's former
+    behaviour of printing and formatting several messages per packet.
+
+    Usage: python3 -m clock_bench.logging_bench [-n DATAGRAMS] [-a ADDRESSES]
+"""
+import argparse
+import logging
+import os
+import socket
+import tempfile
+import time
+
+from clock_protocol import log
+from clock_protocol.tlv import encode_hello
+from clock_server.repository import SubscriberRepository
+from clock_server.server import ClockServer
+
+DEFAULT_DATAGRAMS = 20000
+DEFAULT_ADDRESSES = 64
+
+# name -> arguments of clock_protocol.log.configure
+MODES = (
+    ("unthrottled", ("debug", 0, 1)),
+    ("debug", ("debug", log.DEFAULT_RATE_LIMIT, log.DEFAULT_SAMPLE_RATE)),
+    ("info", ("info", log.DEFAULT_RATE_LIMIT, log.DEFAULT_SAMPLE_RATE)),
+    ("quiet", ("quiet", log.DEFAULT_RATE_LIMIT, log.DEFAULT_SAMPLE_RATE)),
+)
+
+
+def measure(server: ClockServer, addresses: list, datagrams: int) -> float:
+    """ Feeds HELLOs to the server, cycling through the addresses, and returns datagrams per second """
+    hello = encode_hello()
+    count = len(addresses)
+    start = time.perf_counter()
+    for i in range(datagrams):
+        server.handle_input(hello, addresses[i % count])
+    return datagrams / (time.perf_counter() - start)
+
+
+def run(datagrams: int, address_count: int):
+    sinks = []
+    for _ in range(address_count):
+        sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sink.bind(("127.0.0.1", 0))
+        sinks.append(sink)
+    addresses = [sink.getsockname() for sink in sinks]
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as null:
+        repository = SubscriberRepository(os.path.join(directory, "subscribers.json"), flush_interval=60.0)
+        server = ClockServer("127.0.0.1", 0, 120, 3600, repository)
+        server.serv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.schedule = lambda: None      # no broadcasts during the measurement
+        repository.start()
+        try:
+            results = []
+            for name, arguments in MODES:
+                log.configure(*arguments, stream=null)
+                measure(server, addresses, min(datagrams, 1000))     # warm up
+                results.append((name, measure(server, addresses, datagrams)))
+        finally:
+            logging.disable(logging.CRITICAL)
+            repository.stop()
+            server.serv_sock.close()
+            for sink in sinks:
+                sink.close()
+
+    baseline = results[0][1]
+    print(f"{'mode':<14}{'datagrams/s':>14}{'speedup':>10}")
+    for name, rate in results:
+        print(f"{name:<14}{rate:>14.0f}{rate / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.prog = "clock_bench.logging_bench"
+    parser.add_argument("-n", "--datagrams", type=int, default=DEFAULT_DATAGRAMS,
+                        help="number of HELLOs handled in each mode")
+    parser.add_argument("-a", "--addresses", type=int, default=DEFAULT_ADDRESSES,
+                        help="number of distinct client addresses")
+    args = parser.parse_args()
+    run(args.datagrams, args.addresses)
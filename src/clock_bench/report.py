@@ -0,0 +1,97 @@
+import math
+import statistics
+
+from typing import Dict, Iterable, List, Optional
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def percentiles(samples: List[float], scale: float = 1000.0) -> Optional[Dict[str, float]]:
+    """ Summarizes a list of samples with nearest-rank percentiles.
+
+    Args:
+        samples (List[float]): the samples (in seconds)
+        scale (float, optional): factor applied to each summary value; milliseconds by default
+
+    Returns:
+        Dict[str, float]: the count, mean, percentiles and maximum; None if there are no samples
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    summary = {"count": len(ordered), "mean": statistics.fmean(ordered) * scale}
+    for p in PERCENTILES:
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        summary[f"p{p:g}"] = ordered[rank - 1] * scale
+    summary["max"] = ordered[-1] * scale
+    return summary
+
+
+def merge(results: Iterable[Dict]) -> Dict:
+    """ Merges the raw results of several load generator processes """
+    merged = {"latencies": [], "intervals": [], "rounds": {}}
+    for result in results:
+        for name, value in result.items():
+            if name in ("latencies", "intervals"):
+                merged[name].extend(value)
+            elif name == "rounds":
+                for label, (first, last, count) in value.items():
+                    arrivals = merged["rounds"].setdefault(label, [first, last, 0])
+                    arrivals[0] = min(arrivals[0], first)
+                    arrivals[1] = max(arrivals[1], last)
+                    arrivals[2] += count
+            else:
+                merged[name] = merged.get(name, 0) + value
+    return merged
+
+
+def summarize(merged: Dict, clients: int, duration: float, cpu: Optional[float]) -> Dict:
+    """ Computes the benchmark results from the merged raw results.
+
+    Args:
+        merged (Dict): the merged raw results of all load generator processes
+        clients (int): total number of simulated clients
+        duration (float): length of the measurement (in seconds)
+        cpu (float, optional): CPU time used by the server during the measurement (in seconds);
+            None if it wasn't measured
+
+    Returns:
+        Dict: the benchmark results, as written to the results file
+    """
+    intervals = merged["intervals"]
+    period = statistics.median(intervals) if intervals else None
+    rounds = merged["rounds"].values()
+    received = merged["replies"] + merged["broadcasts"]
+    return {
+        "hello": {
+            "sent": merged["hellos_sent"],
+            "replies": merged["replies"],
+            "lost": merged["lost_replies"],
+            "send_errors": merged["send_errors"],
+            "latency_ms": percentiles(merged["latencies"]),
+        },
+        "broadcast": {
+            "datagrams": merged["broadcasts"],
+            "rounds": len(rounds),
+            "period_ms": period * 1000 if period is not None else None,
+            # deviation of each client's inter-arrival interval from the broadcast period
+            "jitter_ms": percentiles([abs(interval - period) for interval in intervals]) if intervals else None,
+            # time from the first to the last subscriber reached in each broadcast
+            "spread_ms": percentiles([last - first for first, last, _ in rounds]),
+            "coverage": statistics.fmean(count / clients for _, _, count in rounds) if rounds else None,
+        },
+        "pps": {
+            "sent": merged["hellos_sent"] / duration,
+            "received": received / duration,
+        },
+        "errors": {
+            "receive": merged["receive_errors"],
+            "invalid": merged["invalid"],
+        },
+        "server_cpu": None if cpu is None else {
+            "seconds": cpu,
+            "utilization": cpu / duration,
+            # CPU time the server spends on each subscriber per second of wall time
+            "us_per_subscriber_second": cpu / duration / clients * 1e6,
+        },
+    }
@@ -1,11 +1,12 @@
 import argparse
-import logging
-import sys
 
+from clock_protocol import log
 from .chronometer import Chronometer
 from .client import ClockClient
+from .loop import ClientLoop
 from .ui.clock import ClockUI
 from .ui.led import COLORS
+from .ui.wall import ClockWall
 
 TITLE = "NetClock"
 LOCAL_IP = "0.0.0.0"
@@ -30,6 +31,16 @@ def size(value):
         return BASE_SIZE + value - 1
     except ValueError:
         raise argparse.ArgumentTypeError(f"size must be in the range 1..20")
+
+def server_address(value, default_port):
+    """ Splits a HOST[:PORT] argument into a host and port """
+    host, _, port = value.rpartition(":")
+    if not host:
+        return value, default_port
+    try:
+        return host, int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid port in '{value}'")
     
 
 def parse_cli():
@@ -39,20 +50,39 @@ def parse_cli():
     parser.add_argument("-c", "--color", type=color, default=DEFAULT_COLOR, help=f"LED display color; {', '.join(sorted(COLORS.keys()))}")
     parser.add_argument("-s", "--size", type=size, default=DEFAULT_SIZE, help=f"LED display size [1..20]")
     parser.add_argument("-p", "--port", type=int, default=SERVER_PORT, help="server port")
-    parser.add_argument("-D", "--debug", action="store_true", help="enable debug logging")
-    parser.add_argument("host", type=str, help="server hostname or IP address")
+    parser.add_argument("--timer-chronometer", action="store_true",
+                        help="advance the chronometer with a timer instead of computing the time when it is read")
+    parser.add_argument("--discipline", action="store_true",
+                        help="slew the chronometer towards network time and correct its frequency instead of stepping it")
+    parser.add_argument("-l", "--log", choices=list(log.LOG_MODES.keys()), default=log.DEFAULT_LOG_MODE,
+                        help="logging mode; quiet logs only warnings and errors")
+    parser.add_argument("--log-rate", type=float, default=log.DEFAULT_RATE_LIMIT,
+                        help="maximum log records per second from each call site (0 for no limit)")
+    parser.add_argument("--log-sample", type=int, default=log.DEFAULT_SAMPLE_RATE,
+                        help="log one in this many records on per-packet paths")
+    parser.add_argument("-D", "--debug", action="store_true", help="enable debug logging (same as --log debug)")
+    parser.add_argument("--columns", type=int, default=None,
+                        help="number of columns of clock panels when showing more than one server")
+    parser.add_argument("host", type=str, nargs="+",
+                        help="server hostname or IP address, optionally with a :PORT; "
+                             "with more than one, a panel is shown for each server")
     args = parser.parse_args()
+    try:
+        args.servers = [server_address(host, args.port) for host in args.host]
+    except argparse.ArgumentTypeError as err:
+        parser.error(str(err))
+    if len(args.servers) > 1 and args.timer_chronometer:
+        parser.error("--timer-chronometer can't be used with more than one host")
     return args
 
-if __name__ == "__main__":
-    args = parse_cli()
-    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if args.debug else logging.INFO)
-
-    chronometer = Chronometer()
-    client = ClockClient(LOCAL_IP, LOCAL_PORT, args.host, args.port, chronometer)
+def run_clock(args):
+    """ Shows the clock for a single server """
+    chronometer = Chronometer(lazy=not args.timer_chronometer, discipline=args.discipline)
+    host, port = args.servers[0]
+    client = ClockClient(LOCAL_IP, LOCAL_PORT, host, port, chronometer)
     client.start()
      
-    ui = ClockUI(chronometer.read, args.color, args.size, TITLE)
+    ui = ClockUI(chronometer.read, args.color, args.size, TITLE, chronometer.until_next_second)
     try:
         ui.run()
     except KeyboardInterrupt:
@@ -61,3 +91,35 @@ if __name__ == "__main__":
     client.stop()
     if chronometer.is_running():
         chronometer.stop()
+
+def run_wall(args):
+    """ Shows a panel for each server, with every client driven by one loop """
+    loop = ClientLoop()
+    chronometers = [Chronometer(lazy=True, discipline=args.discipline) for _ in args.servers]
+    clients = [ClockClient(LOCAL_IP, LOCAL_PORT, host, port, chronometer, loop=loop)
+               for (host, port), chronometer in zip(args.servers, chronometers)]
+    loop.start()
+    for client in clients:
+        client.start()
+
+    ui = ClockWall([chronometer.read for chronometer in chronometers], args.color, args.size, TITLE,
+                   [chronometer.until_next_second for chronometer in chronometers], args.columns)
+    try:
+        ui.run()
+    except KeyboardInterrupt:
+        pass
+
+    for client in clients:
+        client.stop()
+    loop.stop()
+    loop.close()
+
+if __name__ == "__main__":
+    args = parse_cli()
+    log.configure("debug" if args.debug else args.log, args.log_rate, args.log_sample,
+                  format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    if len(args.servers) > 1:
+        run_wall(args)
+    else:
+        run_clock(args)
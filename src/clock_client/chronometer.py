@@ -1,12 +1,28 @@
 import logging
 import time
 from threading import Timer, Lock
-from typing import ByteString
+from typing import ByteString, Optional
 
-from .instant import Instant
+from .instant import US_PER_SECOND, Instant
 
 logger = logging.getLogger(__name__)
 
+# In discipline mode, offsets larger than this (in microseconds) are corrected by a step
+STEP_THRESHOLD_US = 128000
+# Maximum rate at which an offset is slewed away (seconds per second)
+MAX_SLEW_RATE = 500e-6
+# Maximum frequency correction (seconds per second)
+MAX_FREQUENCY = 500e-6
+# The frequency error is measured over at least this many microseconds (NTP's minimum
+# poll interval). Jitter in the times set shows up in a measurement as a frequency error
+# of about jitter / interval, so a longer interval gives a quieter frequency estimate;
+# offsets within the interval are slewed away in the meantime.
+FLL_INTERVAL_US = 64 * US_PER_SECOND
+# Fraction of each frequency error measurement that is corrected. With a quarter, the
+# frequency converges within a few intervals and each measurement's noise is averaged
+# over about four of them.
+FLL_GAIN = 0.25
+
 
 class Chronometer:
     """ A chronometer that can be set using a network date and time source and which 
@@ -22,17 +38,46 @@ class Chronometer:
         
         At any point while the chronometer is running you may call `set` again to update
         the date and time. 
+
+        In lazy mode the chronometer has no timer. It stores only the instant it was last
+        set to and the monotonic clock reading at that moment, and `read` computes the
+        current instant on demand; reads are then exact to the microsecond rather than
+        up to one refresh interval stale, and an idle chronometer uses no CPU.
+
+        Discipline mode is a lazy mode in which `set` doesn't simply replace the time.
+        It compares the time it is given with the chronometer's own reading at the same
+        moment, and uses the offset to correct the frequency of the local monotonic clock
+        (a frequency-locked loop); the offset itself is then slewed away gradually, at no
+        more than MAX_SLEW_RATE, so the displayed time never jumps. Only an offset beyond
+        STEP_THRESHOLD_US (e.g. when the chronometer is first set) steps the time. Once
+        the frequency error is compensated, the chronometer holds time between much less
+        frequent updates.
     """
     
-    def __init__(self, refresh_interval: float = 0.125):
+    def __init__(self, refresh_interval: float = 0.125, lazy: bool = False, discipline: bool = False):
         """ Initializes a chronometer instance.
 
         Args:
             refresh_interval (float, optional): refresh timer interfaval. Defaults to 0.125 seconds.
+            lazy (bool, optional): compute the current instant when it is read instead of
+                advancing it with a timer
+            discipline (bool, optional): discipline the local clock instead of stepping it on
+                each update (implies lazy)
         """
         self.refresh_interval = refresh_interval
+        self.discipline = discipline
+        self.lazy = lazy or discipline
+        self.steps = 0
+        # discipline mode: the phase error accumulated since the frequency was last
+        # corrected (less the offsets that were still being slewed), and when that was
+        self._fll_residual = 0
+        self._fll_anchor: int = None
         self._instant: Instant = None
         self._last_sys_clock = None
+        # lazy mode: the instant last set, the monotonic_ns reading when it was set, the
+        # frequency correction and the offset being slewed away (the last two are zero
+        # unless disciplined); replaced as a single tuple so that reads need no lock
+        self._reference = (None, 0, 0.0, 0)
         self._refresh_timer: Timer = None
         self._lock = Lock()
     
@@ -53,7 +98,7 @@ class Chronometer:
         Returns:
             bool: True if this chronometer has been set
         """
-        return self._instant is not None
+        return self._instant is not None or self._reference[0] is not None
 
     def is_running(self) -> bool:
         """ Gets the state of a flag indicating whether the chronometer is running.
@@ -61,26 +106,105 @@ class Chronometer:
         Returns:
             bool: True if the chronometer is running; i.e. True if it is keeping time
         """
+        if self.lazy:
+            return self._reference[0] is not None
         return self._refresh_timer is not None
 
+    @property
+    def frequency(self) -> float:
+        """ Gets the frequency correction applied to the local clock (e.g. 20e-6 is 20 ppm fast) """
+        return self._reference[2]
+
+    @staticmethod
+    def _advance(reference: tuple, monotonic_ns: int) -> Instant:
+        instant, anchor, frequency, slew = reference
+        elapsed = (monotonic_ns - anchor) // 1000
+        if not frequency and not slew:
+            return instant.incr(elapsed)
+        correction = min(abs(slew), elapsed * MAX_SLEW_RATE)
+        return instant.incr(round(elapsed * (1.0 + frequency) + (correction if slew > 0 else -correction)))
+
     def read(self) -> Instant:
         """ Gets an Instant that represents this chronometer's current date and time of day """
+        if self.lazy:
+            reference = self._reference
+            if reference[0] is None:
+                return None
+            return self._advance(reference, time.monotonic_ns())
         with self._lock:
             return self._instant        
 
-    def set(self, instant: Instant):
+    def until_next_second(self) -> Optional[float]:
+        """ Gets the time in seconds until the second read from this chronometer next changes;
+            None if the chronometer hasn't been set.
+            A timer-driven chronometer advances only when its timer fires, so the time
+            reported is no more than its refresh interval.
+        """
+        instant = self.read()
+        if instant is None:
+            return None
+        remaining = (US_PER_SECOND - instant.ticks % US_PER_SECOND) / US_PER_SECOND
+        if not self.lazy:
+            return min(remaining, self.refresh_interval)
+        return remaining / (1.0 + self._reference[2])
+
+    def set(self, instant: Instant, monotonic_ns: int = None):
         """ Sets this chronometer to the given instant.
             If this chronometer isn't running before the call to `set` it is started.
 
         Args:
             instant (Instant): an instant representing the date and time to set
+            monotonic_ns (int, optional): the `time.monotonic_ns` reading at which the
+                instant was current; now if not specified
         """
+        if monotonic_ns is None:
+            monotonic_ns = time.monotonic_ns()
+        if self.discipline:
+            self._discipline(instant, monotonic_ns)
+            return
+        if self.lazy:
+            self._reference = (instant, monotonic_ns, 0.0, 0)
+            return
         with self._lock:
-            self._instant = instant
+            # the instant is current at the given reading, not at the previous refresh
+            now = time.monotonic_ns()
+            self._instant = instant.incr((now - monotonic_ns) // 1000)
+            self._last_sys_clock = now
         if not self.is_running():
             self.start()
         
+    def _discipline(self, instant: Instant, monotonic_ns: int):
+        """ Corrects the chronometer's frequency and slews (or steps) its time towards an instant """
+        reference = self._reference
+        previous, anchor, frequency, slew = reference
+        if previous is None:
+            self._reference = (instant, monotonic_ns, 0.0, 0)
+            self._fll_residual, self._fll_anchor = 0, monotonic_ns
+            return
+        predicted = self._advance(reference, monotonic_ns)
+        offset = instant.ticks - predicted.ticks
+        if abs(offset) > STEP_THRESHOLD_US:
+            self.steps += 1
+            logger.info(f"stepping chronometer by {offset} us")
+            self._reference = (instant, monotonic_ns, frequency, 0)
+            self._fll_residual, self._fll_anchor = 0, monotonic_ns
+            return
+        # part of the offset is the previous offset that hasn't been slewed away yet; only
+        # the rest accumulated since the last update, and is due to the frequency error
+        applied = min(abs(slew), (monotonic_ns - anchor) // 1000 * MAX_SLEW_RATE)
+        pending = slew - (applied if slew > 0 else -applied)
+        self._fll_residual += offset - pending
+        interval = (monotonic_ns - self._fll_anchor) // 1000
+        if interval >= FLL_INTERVAL_US:
+            frequency += FLL_GAIN * self._fll_residual / interval
+            frequency = max(-MAX_FREQUENCY, min(MAX_FREQUENCY, frequency))
+            self._fll_residual, self._fll_anchor = 0, monotonic_ns
+        logger.debug(f"chronometer offset {offset} us, frequency {frequency * 1e6:.2f} ppm")
+        self._reference = (predicted, monotonic_ns, frequency, offset)
+
     def start(self):
+        if self.lazy:
+            return      # nothing to run; reads compute the current instant
         self._last_sys_clock = time.monotonic_ns()
         self._refresh_timer = Timer(self.refresh_interval, self._refresh)
         self._refresh_timer.start()
@@ -1,33 +1,49 @@
 from datetime import date
 import logging
-import selectors
 import socket
-from threading import Thread, Event
 import time
 from typing import ByteString
+
+from clock_protocol.log import Hex, SampledLogger
+from clock_protocol.tlv import (MICROSECONDS_PER_CENTI, DateField, HelloField, MicrosecondField, TimeField,
+                                encode_hello, read_fields)
+
 from .chronometer import Chronometer
 from .instant import Instant
+from .loop import ClientLoop, Timer
+from .sync import DEFAULT_WINDOW, OffsetEstimator
 
 
 logger = logging.getLogger(__name__)
+packet_logger = SampledLogger(logger)
 
-SELECT_TIMEOUT = 0.250
 BUFFER_SIZE = 512
 
-TAG_HELLO = 0
-TAG_DATE = 1
-TAG_TIME = 2
+# Until the server advertises its dead interval, an unanswered HELLO is retried after
+# HELLO_RETRY_INTERVAL seconds, doubling up to DEFAULT_HELLO_INTERVAL
+HELLO_RETRY_INTERVAL = 1.0
+DEFAULT_HELLO_INTERVAL = 10.0
 
-LENGTH_HELLO = 2
-LENGTH_DATE = 4
-LENGTH_TIME = 4
+# The subscription is renewed this many times per dead interval, so that a lost HELLO
+# (or reply) doesn't let it lapse
+HELLO_RENEWALS_PER_DEAD_INTERVAL = 3
+MIN_HELLO_INTERVAL = 1.0
+
+# The client gives up after this many successive HELLOs couldn't be sent
+MAX_FAILED_HELLOS = 5
 
 class ClockClient:
     """ The client communication module. 
         A single instance of this type is created in the main entry point of the client program.
+
+        A client is driven by a ClientLoop: its socket is read whenever a datagram arrives,
+        so datagrams are timestamped on arrival, and its HELLOs are sent from timers
+        scheduled from the dead interval that the server advertises. Nothing blocks, so
+        many clients can share one loop (and one thread).
     """
     
-    def __init__(self, local_ip: str, local_port: int, server_ip: str, server_port: int, chronometer: Chronometer):
+    def __init__(self, local_ip: str, local_port: int, server_ip: str, server_port: int, chronometer: Chronometer,
+                 window: int = DEFAULT_WINDOW, loop: ClientLoop = None):
         """ Initializes a clock client instance.
 
         Args:
@@ -37,189 +53,161 @@ class ClockClient:
             server_port (int): port for the server's UDP socket
             chronometer (Chronometer): the chronometer instance to be updated using
                 network date and time
+            window (int, optional): number of delay and offset samples used to estimate
+                the server's time (see OffsetEstimator)
+            loop (ClientLoop, optional): the loop that drives this client; if not given,
+                the client runs its own loop on a thread of its own
         """
         self.local_address = (local_ip, local_port)
         self.server_address = (server_ip, server_port)
         self.chronometer = chronometer
-        self._thread = Thread(target=self._run)
-        self._shutdown = Event()
-        self._hello_interval = 0
-        self._last_hello_time = 0
-
+        self._loop = loop or ClientLoop()
+        self._owns_loop = loop is None
+        self._socket: socket.socket = None
+        self._hello_timer: Timer = None
+        self._dead_interval: int = None
+        self._retry_interval = HELLO_RETRY_INTERVAL
+        self._last_hello_time = 0.0
+        self._hello_sent_ns: int = None
+        self._failed_hellos = 0
+        self.estimator = OffsetEstimator(window)
+
+
+    @property
+    def hello_interval(self) -> float:
+        """ Gets the interval in seconds between HELLOs while subscribed """
+        if self._dead_interval is None:
+            return DEFAULT_HELLO_INTERVAL
+        return max(MIN_HELLO_INTERVAL, self._dead_interval / HELLO_RENEWALS_PER_DEAD_INTERVAL)
 
     def start(self):
-        """ Starts the service thread for the client communication module.
-            This method is called from the main thread of the client program. It
-            must start a new thread and return to the caller.
-            
-            The entry point method for the new thread will subscribe to the server,
-            receive and process date and time updates, and periodically renew the 
-            subscription with the server.
+        """ Starts the client communication module.
+            This method is called from the main thread of the client program and returns
+            to the caller; the client then subscribes to the server, receives and processes
+            date and time updates, and periodically renews the subscription from its loop
+            (which is started here if the client owns it).
         """
-        self._thread.start()
+        self._loop.call_soon_threadsafe(self._open)
+        if self._owns_loop:
+            self._loop.start()
         logger.debug("communication module started")
         
     def stop(self):
-        """ Stops the service thread for the client communication module in preparation
-            for client program shutdown. This method must signal to the service thread
-            that it should exit and then it must `join` the service thread to await the
-            thread's termination before returning.
+        """ Stops the client communication module in preparation for client program shutdown.
+            If the client owns its loop, the loop's thread is stopped and joined before
+            this method returns.
         """
-        self._shutdown.set()
-        self._thread.join()
-
+        self._loop.call_soon_threadsafe(self._close)
+        if self._owns_loop:
+            self._loop.stop()
+            self._loop.close()
 
-    def _to_int(byte: bytes) -> int:
-        return int.from_bytes(byte, 'big')
-    
-    # def _decode_date(self, date: ByteString):
-    #     try:
-    #         if len(date) != 4:
-    #             raise ValueError("Date field should not have a value of length more than 4 octets")
-    #         flag = date[0] << 7
-    #         week_day = self._to_int(date[0] & 0b111)
-    #         year = self._to_int(date[1] + 2000)
-    #         if flag:
-    #             year += 100
-    #         month = self._to_int(date[2])
-    #         month_day = self._to_int(date[3])
-    #         return week_day, year, month, month_day
-    #     except ValueError:
-    #         logger.error(ValueError)
-    #         return None
-
-    # def _decode_time(self, time: ByteString):
-    #     try:
-    #         if len(time) != 4:
-    #             raise ValueError("Time field should not have a value of length more than 4 octets")
-    #         hour = self._to_int(time[0])
-    #         minute = self._to_int(time[1])
-    #         second = self._to_int(time[2])
-    #         centi_second = self._to_int(time[3])
-    #         return hour, minute, second, centi_second
-    #     except ValueError:
-    #         logger.error(ValueError)
-    #         return None
-
-    def _handle_input(self, data: ByteString):
-        date, time = None, None
-        logger.info("handling input")
-        for tag, value in self._tlv_reader(data):
-            logger.info(f"Tag: {tag}, \t Value: {value}")
-            if tag == TAG_HELLO:
-                print(value)
-                self._hello_interval = value
-            elif tag == TAG_DATE:
-                date = value
-            elif tag == TAG_TIME:
-                time = value
-            else:
-                # Invalid tag, skip this iteration and get the next tag and value
-                continue
+    def _open(self):
+        logger.info("running")
+        self._socket = self._open_socket()
+        self._loop.add_reader(self._socket, self._on_readable)
+        self._send_hello()
+
+    def _close(self):
+        if self._socket is None:
+            return
+        if self._hello_timer is not None:
+            self._hello_timer.cancel()
+        self._loop.remove_reader(self._socket)
+        self._socket.close()
+        self._socket = None
+
+    def _on_readable(self):
+        """ Receives every datagram waiting in the socket buffer """
+        while self._socket is not None:
+            try:
+                data = self._socket.recv(BUFFER_SIZE)
+            except BlockingIOError:
+                return
+            except OSError as err:
+                logger.error(f"receive error: {err}")
+                return
+            self._handle_input(data, time.monotonic_ns())
+
+
+    def _handle_input(self, data: ByteString, received_ns: int):
+        date, time, microsecond = None, None, None
+        packet_logger.debug("received %s", Hex(data))
+        try:
+            for field in read_fields(data):
+                if isinstance(field, HelloField):
+                    if self._hello_sent_ns is not None:
+                        self.estimator.add_round_trip(self._hello_sent_ns, received_ns)
+                        self._hello_sent_ns = None
+                    if field.dead_interval is not None and field.dead_interval != self._dead_interval:
+                        self._dead_interval = field.dead_interval
+                        self._schedule_hello(self._last_hello_time + self.hello_interval)
+                elif isinstance(field, DateField):
+                    date = field
+                elif isinstance(field, TimeField):
+                    time = field
+                elif isinstance(field, MicrosecondField):
+                    microsecond = field.microsecond
+                # fields with unknown tags are skipped
+        except ValueError as err:
+            logger.error(f"invalid message from server: {err}")
+            return
         if date and time:
-            logger.info("Received datetime")
-            print("Recieved date and time")
-            instant = self._decode_instant(date, time)
-            self.chronometer.set(instant)
-
-
-    def _decode_instant(self, date, time):
-        week  = int(date / 16777216) % 16
-        year  = int(date / 65536) % 256
-        year  = int(year / 16) * 10 + year % 16
-        month = int(date / 256) % 256
-        month = int(month / 16) * 10 + month % 16
-        day   = date % 256
-        day   = int(day / 16) * 10 + day % 16
-        hours = int(time / 16777216) % 256
-        hours = int(hours / 16) * 10 + hours % 16
-        minutes = int(time / 65536) % 256
-        minutes = int(minutes / 16) * 10 + minutes % 16
-        seconds = int(time / 256) % 256
-        seconds = int(seconds / 16) * 10 + seconds % 16
-        centi = time % 256
-        centi = int(centi / 16) * 10 + centi % 16
-        #year = int.from_bytes(date[0:2], "big")
-        #month = date[2]
-        #day = date[3]
-        #hours = time[0]
-        #minutes = time[1]
-        #seconds = time[2]
-        logger.info(f"Year:   \t{year}")
-        logger.info(f"Month:  \t{month}")
-        logger.info(f"Day:    \t{day}")
-        logger.info(f"Week:   \t{week}")
-        logger.info(f"Hour:   \t{hours}")
-        logger.info(f"Minute: \t{minutes}")
-        logger.info(f"Second: \t{seconds}")
-        logger.info(f"Centi:  \t{centi}")
-        return Instant(year, month, day, week, hours, minutes, seconds, centi)
-
-
-    def _create_hello(self):
-        message = bytearray()
-        tag = int(TAG_HELLO)
-        length = int(0)
-        tag_length = self._tag_length(tag, length)
-        print("Entered create hello")
-        print(tag_length)
-        message.append(tag_length)
-        return message  
-
-    def _tag_length(self, tag, length):
-        return (tag << 8) | length
-
-    def _tlv_reader(self, data):
-        logger.info(f"Received Data: {data}")
-        for i in data: print(hex(i))
-        index = 0
-        while index < len(data):
-            if index + 2 > len(data):
-                # Not enough elements to decode TLV, break loop
-                break
-            tag = data[index]
-            length = tag % 16
-            tag = int(tag / 16)
-            #logger.info(f"Tag: {tag}, \t Length: {length}")
-            #index += 1
-            #length = data[index]
-            index += 1
-            if index + length > len(data):
-                # Not enough elements to decode TLV value, break loop
-                break
-            value = int.from_bytes(data[index : index + length], "big")
-            index += length
-            # create a generator that can be iterated over
-            # tuple of (tlv_type, tlv_value)
-            yield tag, value
-
-        
-    def _send_hello(self, max_attempts=5):
-        attempt = 0
-        while attempt < max_attempts:
-            hello_delta = time.monotonic() - self._last_hello_time
-            print("hello_delta: ", hello_delta)
-            print("_hello_interval: ", self._hello_interval)
-            if hello_delta >= self._hello_interval:
-                try:
-                    message = self._create_hello()
-                    print("Message to send: ", message)
-                    self._socket.sendto(message, self.server_address)
-                    print("Message sent: ", message)
-                    self._last_hello_time = time.monotonic()
-                    if self._hello_interval == 0:
-                        self._hello_interval = 10
-                    return
-                except Exception as e:
-                    attempt += 1
-                    logger.error(f"Error occurred while sending hello: {e}")
-                    time.sleep(self._hello_interval)
-            else:
-                time.sleep(self._hello_interval - hello_delta)
-        raise Exception("Failed to send hello after multiple attempts")
-
-
-
+            try:
+                instant = self._decode_instant(date, time, microsecond)
+            except ValueError as err:
+                logger.error(f"invalid date from server: {err}")
+                return
+            frequency = self.chronometer.frequency if self.chronometer.discipline else None
+            ticks = self.estimator.add_time(instant.ticks, received_ns, frequency)
+            packet_logger.debug("server time offset %d us, delay %s us",
+                                ticks - instant.ticks, self.estimator.delay_us)
+            self.chronometer.set(Instant.from_ticks(ticks), received_ns)
+
+    def _decode_instant(self, date: DateField, time: TimeField, microsecond: int = None) -> Instant:
+        """ Converts the DATE and TIME fields (and the MICROSECOND field, if the server sent
+            one that is consistent with the TIME field's hundredths) to an instant
+        """
+        if microsecond is None or microsecond // MICROSECONDS_PER_CENTI != time.centi:
+            microsecond = time.centi * MICROSECONDS_PER_CENTI
+        return Instant(date.year, date.month, date.day, date.week_day,
+                       time.hour, time.minute, time.second, microsecond)
+
+    def _create_hello(self) -> bytes:
+        return encode_hello()
+
+    def _schedule_hello(self, deadline: float):
+        if self._hello_timer is not None:
+            self._hello_timer.cancel()
+        self._hello_timer = self._loop.call_at(deadline, self._send_hello)
+
+    def _send_hello(self):
+        """ Sends a HELLO and schedules the next one. Until the server has replied, HELLOs
+            are retried with exponential backoff; after that they renew the subscription
+            several times per dead interval. A failed HELLO is retried when the next one is due.
+        """
+        if self._socket is None:
+            return
+        try:
+            message = self._create_hello()
+            self._hello_sent_ns = time.monotonic_ns()
+            self._socket.sendto(message, self.server_address)
+            packet_logger.debug("sent HELLO to %s", self.server_address)
+            self._failed_hellos = 0
+        except OSError as e:
+            self._failed_hellos += 1
+            logger.error(f"Error occurred while sending hello: {e}")
+            if self._failed_hellos >= MAX_FAILED_HELLOS:
+                logger.error("Failed to send hello after multiple attempts; stopping")
+                self._close()
+                return
+        self._last_hello_time = time.monotonic()
+        if self._dead_interval is None:
+            interval = self._retry_interval
+            self._retry_interval = min(2 * self._retry_interval, DEFAULT_HELLO_INTERVAL)
+        else:
+            interval = self.hello_interval
+        self._schedule_hello(self._last_hello_time + interval)
 
     def _open_socket(self):
         """ Open a UDP socket and bind it to a local address.
@@ -229,21 +217,5 @@ class ClockClient:
         """
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.bind(self.local_address)
+        sock.setblocking(False)
         return sock
-    
-    def _run(self):
-        logger.info("running")
-        self._socket = self._open_socket()
-        selector = selectors.DefaultSelector()
-        selector.register(self._socket, selectors.EVENT_READ)
-        while not self._shutdown.is_set():
-            self._send_hello()
-            print("Successfully sent hello")
-            try:
-                if selector.select(SELECT_TIMEOUT):
-                    data = self._socket.recv(BUFFER_SIZE)
-                    self._handle_input(data)
-            except OSError as err:
-                logger.error(f"receive error: {err}")
-
-        self._socket.close()
\ No newline at end of file
@@ -1,71 +1,111 @@
-from typing import ByteString, Tuple
+import functools
 
+from datetime import date
+from typing import Tuple
 
-class Instant:
-    """ An instant in chronological time. """
+US_PER_SECOND = 1000000
+US_PER_MINUTE = 60 * US_PER_SECOND
+US_PER_HOUR = 60 * US_PER_MINUTE
+US_PER_DAY = 24 * US_PER_HOUR
 
-    _DAYS_OF_WEEK = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN", "???")
-    _MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
-    _MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Proleptic Gregorian ordinal of the epoch (1970-01-01)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
-    @classmethod
-    def _day_of_year(cls, month: int, day_of_month: int) -> int:
-        """ Computes the day of the year for the given month and day of the month.
-            NOTE: this implementation does not account for leap years
-        
-        Args:
-            month (int): month number [1..12]
-            day_of_month (int): day of the month [1..31]; caller should bound as appropriate for specified month)
+# Number of days for which calendar fields are kept; a clock only ever needs the last one or two
+CALENDAR_CACHE_SIZE = 8
 
-        Returns:
-            int: day of the year [1..365]
-        """
-        day_of_year = 0
-        for m in range(0, month - 1):
-            day_of_year += cls._MONTH_DAYS[m]
-        return day_of_year + day_of_month
-        
-    @classmethod
-    def _month_and_day(cls, day_of_year: int) -> Tuple[int, int]:
-        """ Computes the month and day of the month given a day of the year.
-            NOTE: this implementation does not account for leap years
 
-        Args:
-            day_of_year (int): day of the year [1..365]
+@functools.lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+def _calendar(day: int) -> Tuple[int, int, int, int]:
+    """ Computes the calendar fields for a day, counted from the epoch (leap years included).
 
-        Returns:
-            Tuple[int, int]: month [1..12] and day of the month [1..31]
-        """
-        month = 0
-        remaining_days = day_of_year
-        while remaining_days - cls._MONTH_DAYS[month] > 0:
-            remaining_days -= cls._MONTH_DAYS[month]
-            month += 1
-        return month + 1, remaining_days        
-
-    def __init__(self, year: int, month: int, day_of_month, day_of_week: int,
-                 hour: int, minute: int, second: int, microsecond: int):
+    Returns:
+        Tuple[int, int, int, int]: year, month [1..12], day of the month [1..31],
+            and day of the week [0..6] (Monday is 0)
+    """
+    d = date.fromordinal(day + _EPOCH_ORDINAL)
+    return d.year, d.month, d.day, d.weekday()
+
+
+class Instant:
+    """ An instant in chronological time.
+        An instant is a single integer count of microseconds since the epoch (midnight on
+        1970-01-01, in the network time source's time zone), so advancing it is one integer
+        addition. The calendar fields are derived when they are read, and are computed only
+        once per day.
+    """
+
+    _DAYS_OF_WEEK = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+    _MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+
+    __slots__ = ("ticks",)
+
+    def __init__(self, year: int, month: int, day_of_month: int, day_of_week: int = None,
+                 hour: int = 0, minute: int = 0, second: int = 0, microsecond: int = 0):
         """ Initializes a new instant
 
         Args:
             year (int): year [2000..)
             month (int): month [1..12]
             day_of_month (int): day of the month [1..31]
-            day_of_week (int): day of the week [0..6]
+            day_of_week (int, optional): day of the week [0..6]; ignored, since it is
+                determined by the date
             hour (int): [0..23]
             minute (int): [0..59]
             second (int): [0..59]
             microsecond (int): [0..999999]
+
+        Raises:
+            ValueError: if the date is not a valid calendar date
         """
-        self.year = year
-        self.month = month
-        self.day_of_month = day_of_month
-        self.day_of_week = day_of_week
-        self.hour = hour
-        self.minute = minute
-        self.second = second
-        self.microsecond = microsecond
-    
+        day = date(year, month, day_of_month).toordinal() - _EPOCH_ORDINAL
+        self.ticks = (day * US_PER_DAY + hour * US_PER_HOUR + minute * US_PER_MINUTE
+                      + second * US_PER_SECOND + microsecond)
+
+    @classmethod
+    def from_ticks(cls, ticks: int) -> "Instant":
+        """ Produces an instant from a count of microseconds since the epoch """
+        instant = cls.__new__(cls)
+        instant.ticks = ticks
+        return instant
+
+    @property
+    def day(self) -> int:
+        """ Gets the number of days since the epoch """
+        return self.ticks // US_PER_DAY
+
+    @property
+    def year(self) -> int:
+        return _calendar(self.ticks // US_PER_DAY)[0]
+
+    @property
+    def month(self) -> int:
+        return _calendar(self.ticks // US_PER_DAY)[1]
+
+    @property
+    def day_of_month(self) -> int:
+        return _calendar(self.ticks // US_PER_DAY)[2]
+
+    @property
+    def day_of_week(self) -> int:
+        return _calendar(self.ticks // US_PER_DAY)[3]
+
+    @property
+    def hour(self) -> int:
+        return self.ticks % US_PER_DAY // US_PER_HOUR
+
+    @property
+    def minute(self) -> int:
+        return self.ticks % US_PER_HOUR // US_PER_MINUTE
+
+    @property
+    def second(self) -> int:
+        return self.ticks % US_PER_MINUTE // US_PER_SECOND
+
+    @property
+    def microsecond(self) -> int:
+        return self.ticks % US_PER_SECOND
+
     @property
     def month_name(self):
         return self._MONTHS[self.month - 1]
@@ -73,7 +113,7 @@ class Instant:
     @property
     def day_name(self):
         return self._DAYS_OF_WEEK[self.day_of_week]
-    
+
     def incr(self, ticks: int) -> "Instant":
         """ Produces a new instant representing this instant plus the given tick count (microseconds).
 
@@ -83,17 +123,14 @@ class Instant:
         Returns:
             Instant: new instant = self + ticks
         """
-        microseconds = self.microsecond + ticks
-        microsecond = microseconds % 1000000
-        seconds = self.second + (microseconds // 1000000)
-        second = seconds % 60
-        minutes = self.minute + (seconds // 60)
-        minute = minutes % 60
-        hours = self.hour + (minutes // 60)
-        hour = hours % 24
-        days = hours // 24
-        day_of_week = self.day_of_week + (days % 7)
-        day_of_year = (self._day_of_year(self.month, self.day_of_month) + days) % 365
-        month, day_of_month = self._month_and_day(day_of_year)
-        year = self.year + (days // 365)
-        return Instant(year, month, day_of_month, day_of_week, hour, minute, second, microsecond)
+        return Instant.from_ticks(self.ticks + ticks)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Instant) and self.ticks == other.ticks
+
+    def __hash__(self) -> int:
+        return hash(self.ticks)
+
+    def __repr__(self) -> str:
+        return (f"{__class__.__name__}({self.year:04}-{self.month:02}-{self.day_of_month:02} {self.day_name} "
+                f"{self.hour:02}:{self.minute:02}:{self.second:02}.{self.microsecond:06})")
@@ -0,0 +1,142 @@
+import heapq
+import itertools
+import logging
+import selectors
+import socket
+import time
+
+from collections import deque
+from threading import Thread
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """ A callback scheduled on a ClientLoop; cancelling it leaves it in the loop's heap,
+        where it is skipped when its deadline arrives
+    """
+
+    __slots__ = ("deadline", "callback", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[[], None]):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ClientLoop:
+    """ An event loop for clock clients: a single selector for every client's socket and
+        a heap of timer deadlines, serviced by one thread.
+        The loop sleeps until a datagram arrives or the earliest deadline passes, so a
+        client never polls, and any number of clients can share a single thread.
+
+        Sockets and timers are owned by the loop's thread. Other threads hand work to the
+        loop with `call_soon_threadsafe`, which wakes the loop up.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._timers: List[tuple] = []
+        self._sequence = itertools.count()
+        self._pending = deque()
+        self._stopping = False
+        self._thread: Thread = None
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._waker.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ, self._drain_wakeup)
+
+    @property
+    def reader_count(self) -> int:
+        """ Gets the number of sockets being watched (excluding the loop's own wakeup socket) """
+        return len(self._selector.get_map()) - 1
+
+    def add_reader(self, sock: socket.socket, callback: Callable[[], None]):
+        """ Calls a function (in the loop's thread) whenever a socket is readable """
+        self._selector.register(sock, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, sock: socket.socket):
+        """ Stops watching a socket """
+        self._selector.unregister(sock)
+
+    def call_at(self, deadline: float, callback: Callable[[], None]) -> Timer:
+        """ Schedules a function to be called (in the loop's thread) at a `time.monotonic` deadline """
+        timer = Timer(deadline, callback)
+        heapq.heappush(self._timers, (deadline, next(self._sequence), timer))
+        return timer
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """ Schedules a function to be called (in the loop's thread) after a delay in seconds """
+        return self.call_at(time.monotonic() + delay, callback)
+
+    def call_soon_threadsafe(self, callback: Callable[[], None]):
+        """ Schedules a function to be called in the loop's thread; may be called from any thread """
+        self._pending.append(callback)
+        try:
+            self._waker.send(b"\0")
+        except BlockingIOError:
+            pass    # the loop already has a wakeup waiting
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup.recv(512):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _call(self, callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception:
+            logger.exception(f"error in client loop callback {callback}")
+
+    def _timeout(self) -> float:
+        """ Gets the time until the earliest timer is due; None if there are no timers """
+        if self._pending:
+            return 0
+        while self._timers and self._timers[0][2].cancelled:
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return None
+        return max(0.0, self._timers[0][0] - time.monotonic())
+
+    def run(self):
+        """ Runs the loop in the calling thread until `stop` is called """
+        self._stopping = False
+        while not self._stopping:
+            for key, _ in self._selector.select(self._timeout()):
+                self._call(key.data)
+            while self._pending:
+                self._call(self._pending.popleft())
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                timer = heapq.heappop(self._timers)[2]
+                if not timer.cancelled:
+                    self._call(timer.callback)
+
+    def start(self):
+        """ Starts a thread that runs the loop """
+        self._thread = Thread(target=self.run, name="client-loop", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stops the loop once the callbacks already handed to it have run, and waits for
+            the loop's thread (if it was started with `start`) to exit
+        """
+        self.call_soon_threadsafe(self._stop)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _stop(self):
+        self._stopping = True
+
+    def close(self):
+        """ Releases the loop's selector and wakeup sockets; the loop must not be running """
+        self._selector.close()
+        self._wakeup.close()
+        self._waker.close()
@@ -0,0 +1,112 @@
+from collections import deque
+from typing import Optional
+
+from .chronometer import MAX_FREQUENCY
+
+# Number of samples in the sliding window (the same as NTP's clock filter)
+DEFAULT_WINDOW = 8
+
+# A sample this far (in microseconds) from the current estimate is an outlier; if
+# STEP_CONFIRMATIONS successive samples are outliers, the server's clock was stepped
+# and the samples taken before the step are discarded
+STEP_THRESHOLD_US = 1000000
+STEP_CONFIRMATIONS = 3
+
+# Rate (seconds per second) at which a sample is aged when the local clock's frequency
+# error is measured: the error left after correcting for the measured frequency (NTP's
+# frequency tolerance, PHI). When it isn't measured, samples are aged at MAX_FREQUENCY,
+# so that an old sample can't beat a newer one just because the local clock drifted.
+FREQUENCY_TOLERANCE = 15e-6
+
+
+class OffsetEstimator:
+    """ Estimates the server's time from the time-bearing datagrams it sends, in the manner
+        of NTP's clock filter.
+
+        Every datagram that carries the server's date and time yields a sample of the
+        difference between the server time it carries and the local monotonic time at which
+        it was received. The server time lags the true server time at reception by the
+        datagram's one-way delay, so each sample underestimates the true offset by that
+        delay; the largest sample in a sliding window comes from the least delayed datagram
+        and is the best estimate. Half of the smallest round trip measured between a HELLO
+        and its reply is added back, as the one-way delay that even that datagram suffered.
+        Queueing delay (in the network, in the server's fan-out, or in the client's select
+        loop) therefore doesn't shift the estimate.
+
+        The local clock drifts while a window's samples are taken: if it runs fast, older
+        samples are larger and would always be picked. Each sample is therefore brought
+        forward to the newest sample's time by the local clock's measured frequency error,
+        and aged (made less likely to be picked) by the error that frequency may still have,
+        in the manner of the dispersion in NTP's clock filter.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        """ Initializes an estimator with no samples.
+
+        Args:
+            window (int, optional): number of samples of each kind that are kept.
+                Defaults to DEFAULT_WINDOW.
+        """
+        self._offsets = deque(maxlen=window)     # (offset, received_us) pairs
+        self._frequency: float = None
+        self._round_trips = deque(maxlen=window)
+        self._outliers = 0
+
+    @property
+    def delay_us(self) -> Optional[int]:
+        """ Gets the estimated one-way delay in microseconds; None if no round trip has been measured """
+        return min(self._round_trips) // 2 if self._round_trips else None
+
+    @property
+    def offset_us(self) -> Optional[int]:
+        """ Gets the estimated difference between server time (microseconds since the epoch)
+            and local monotonic time (in microseconds); None if there are no samples
+        """
+        if not self._offsets:
+            return None
+        latest = self._offsets[-1][1]
+        frequency = self._frequency or 0.0
+        tolerance = FREQUENCY_TOLERANCE if self._frequency is not None else MAX_FREQUENCY
+        offset, received_us = max(self._offsets,
+                                  key=lambda sample: sample[0] + (frequency - tolerance) * (latest - sample[1]))
+        return round(offset + frequency * (latest - received_us)) + (self.delay_us or 0)
+
+    def add_round_trip(self, sent_ns: int, received_ns: int):
+        """ Adds a round trip sample.
+
+        Args:
+            sent_ns (int): monotonic_ns reading when a HELLO was sent
+            received_ns (int): monotonic_ns reading when the reply was received
+        """
+        if received_ns >= sent_ns:
+            self._round_trips.append((received_ns - sent_ns) // 1000)
+
+    def add_time(self, server_ticks: int, received_ns: int, frequency: float = None) -> int:
+        """ Adds a sample of the server's time and estimates the server's time at reception.
+
+        Args:
+            server_ticks (int): the server time carried by a datagram, in microseconds since the epoch
+            received_ns (int): monotonic_ns reading when the datagram was received
+            frequency (float, optional): the measured frequency correction for the local
+                monotonic clock (see Chronometer.frequency); None if it isn't measured
+
+        Returns:
+            int: the estimated server time at reception, in microseconds since the epoch
+        """
+        received_us = received_ns // 1000
+        sample = server_ticks - received_us
+        self._frequency = frequency
+        current = self.offset_us
+        if current is not None and abs(sample + (self.delay_us or 0) - current) > STEP_THRESHOLD_US:
+            self._outliers += 1
+            if self._outliers < STEP_CONFIRMATIONS:
+                return received_us + current
+            self._offsets.clear()
+        self._outliers = 0
+        self._offsets.append((sample, received_us))
+        return received_us + self.offset_us
+
+    def server_ticks(self, monotonic_ns: int) -> Optional[int]:
+        """ Estimates the server's time at a monotonic clock reading; None if there are no samples """
+        offset = self.offset_us
+        return None if offset is None else monotonic_ns // 1000 + offset
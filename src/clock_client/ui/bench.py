@@ -0,0 +1,81 @@
+""" Frame rendering benchmark for the LED clock display.
+
+    Renders frames with an OffscreenClock (no window or video driver is needed) and
+    reports the render time per frame in each mode:
+        full: the surface is cleared and every character is redrawn
+        second: the time advances by one second per frame; only changed characters are drawn
+        idle: the time doesn't change, so nothing is drawn
+
+    Usage: python3 -m clock_client.ui.bench [-n FRAMES] [-w SEGMENT_WIDTH] [-c COLOR] [-o FILE]
+"""
+import argparse
+import time
+
+from ..instant import US_PER_SECOND, Instant
+from .led import COLORS
+from .offscreen import OffscreenClock
+
+DEFAULT_FRAMES = 2000
+DEFAULT_SEGMENT_WIDTH = 11
+DEFAULT_COLOR = "amber"
+
+# A start time that rolls every field over during a run: 23:59:59 on New Year's Eve
+START = Instant(2099, 12, 31, None, 23, 59, 59)
+
+# name -> (seconds the time advances per frame, redraw everything)
+MODES = (
+    ("full", (1, True)),
+    ("second", (1, False)),
+    ("idle", (0, False)),
+)
+
+
+def measure(clock: OffscreenClock, frames: int, step: int, full: bool) -> list:
+    """ Renders frames and returns the render time of each, in seconds """
+    durations = []
+    ticks = START.ticks
+    clock.render(START, full=True)
+    for _ in range(frames):
+        ticks += step * US_PER_SECOND
+        instant = Instant.from_ticks(ticks)
+        start = time.perf_counter()
+        clock.render(instant, full)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def run(frames: int, segment_width: int, color: str, output: str = None):
+    clock = OffscreenClock(color, segment_width)
+    print(f"{clock.size[0]}x{clock.size[1]} pixels, {frames} frames per mode")
+    print(f"{'mode':<8}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'frames/s':>12}")
+    for name, (step, full) in MODES:
+        durations = sorted(measure(clock, frames, step, full))
+        mean = sum(durations) / len(durations)
+        p50 = durations[len(durations) // 2]
+        p99 = durations[min(len(durations) - 1, len(durations) * 99 // 100)]
+        print(f"{name:<8}{mean * 1e6:>10.1f}{p50 * 1e6:>10.1f}{p99 * 1e6:>10.1f}{1 / mean:>12.0f}")
+
+    if output:
+        if output.lower().endswith(".raw"):
+            with open(output, "wb") as file:
+                file.write(clock.to_bytes())
+            print(f"saved the last frame to {output} ({clock.size[0]}x{clock.size[1]} RGB)")
+        else:
+            clock.save(output)
+            print(f"saved the last frame to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.prog = "clock_client.ui.bench"
+    parser.add_argument("-n", "--frames", type=int, default=DEFAULT_FRAMES,
+                        help="number of frames rendered in each mode")
+    parser.add_argument("-w", "--segment-width", type=int, default=DEFAULT_SEGMENT_WIDTH,
+                        help="time display segment width in pixels")
+    parser.add_argument("-c", "--color", choices=sorted(COLORS.keys()), default=DEFAULT_COLOR,
+                        help="LED display color")
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="save the last frame to a file: raw RGB pixels if it ends in .raw, "
+                             "otherwise an image of the type given by the extension (e.g. .png)")
+    args = parser.parse_args()
+    run(args.frames, args.segment_width, args.color, args.output)
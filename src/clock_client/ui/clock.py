@@ -1,4 +1,6 @@
-from typing import Callable, Any
+import math
+
+from typing import Callable, Any, Optional
 
 import pygame
 
@@ -8,11 +10,76 @@ from .time_display import TimeDisplay
 
 FRAMES_PERS_SECOND = 10
 
+# Frames are drawn this long (in milliseconds) after the displayed second is due to change,
+# so that the time read then is already in the new second
+FRAME_LATENESS_MS = 1
+
+
+class ClockFace:
+    """ The date and time displays of a clock, laid out on a surface: the date centered
+        above the time, with date segments 3/5 the width of the time segments
+    """
+
+    @classmethod
+    def layout(cls, time_segment_width: int) -> tuple:
+        """ Computes the layout of a clock face for a given time segment width
+
+        Returns:
+            tuple: the face's size, the date segment width, and the offsets of the date
+                and time displays within the face
+        """
+        time_width = TimeDisplay.width(time_segment_width)
+        time_height = TimeDisplay.height(time_segment_width)
+        date_segment_width = int(time_segment_width * 3 / 5)
+        date_width = DateDisplay.width(date_segment_width)
+        date_height = DateDisplay.height(date_segment_width)
+
+        width = max(time_width, date_width)
+        height = time_height + date_height
+        return ((width, height), date_segment_width,
+                ((width - date_width) // 2, 0), ((width - time_width) // 2, date_height))
+
+    @classmethod
+    def size(cls, time_segment_width: int) -> tuple:
+        """ Computes the size (width, height) of a clock face for a given time segment width """
+        return cls.layout(time_segment_width)[0]
+
+    def __init__(self, surface, xy, color: str, time_segment_width: int):
+        """ Initializes a clock face.
+
+        Args:
+            surface: a pygame drawing surface
+            xy: pygame coordinate pair (2-tuple or vector) for the top left corner
+            color (str): color for the simulated LED display (see led.COLORS for names)
+            time_segment_width (int): desired segment width for the time display
+        """
+        _, date_segment_width, date_xy, time_xy = self.layout(time_segment_width)
+        self._date_display = DateDisplay(surface, (xy[0] + date_xy[0], xy[1] + date_xy[1]),
+                                         date_segment_width, color)
+        self._time_display = TimeDisplay(surface, (xy[0] + time_xy[0], xy[1] + time_xy[1]),
+                                         time_segment_width, color)
+
+    def invalidate(self):
+        """ Forgets what the face shows, so that the next draw redraws all of it """
+        self._date_display.invalidate()
+        self._time_display.invalidate()
+
+    def draw(self, instant) -> list:
+        """ Draws a date and time of day (see ClockUI for the attributes it must have)
+
+        Returns:
+            list: the areas of the surface that were drawn: only the characters that changed
+        """
+        areas = self._date_display.draw(instant.year, instant.month_name, instant.day_of_month, instant.day_name)
+        areas += self._time_display.draw(instant.hour, instant.minute, instant.second)
+        return areas
+
 
 class ClockUI:
     """ The top-level clock UI simulator """
     
-    def __init__(self, time_supplier: Callable[[], Any], color: str, time_segment_width: int, title: str):
+    def __init__(self, time_supplier: Callable[[], Any], color: str, time_segment_width: int, title: str,
+                 frame_scheduler: Callable[[], Optional[float]] = None):
         """ Initializes the clock UI instance.
 
         Args:
@@ -28,47 +95,78 @@ class ClockUI:
             color (str): color for the simulated LED display (see led.COLORS for names)
             time_segment_width (int): desired segment width for the time display
             title (str): title for the UI window
+            frame_scheduler (Callable[[], Optional[float]], optional): a function that returns
+                the time in seconds until the displayed second next changes (or None if it
+                isn't known), such as Chronometer.until_next_second. If given, the UI sleeps
+                until each change instead of polling at FRAMES_PERS_SECOND.
         """
         self._time_supplier = time_supplier
+        self._frame_scheduler = frame_scheduler
         self._color = color
         self._title = title
-    
-        time_width = TimeDisplay.width(time_segment_width)
-        time_height = TimeDisplay.height(time_segment_width)
-        date_segment_width = int(time_segment_width * 3 / 5)
-        date_width = DateDisplay.width(date_segment_width)
-        date_height = DateDisplay.height(date_segment_width)
+        self._time_segment_width = time_segment_width
+        self._ui_size = ClockFace.size(time_segment_width)
 
-        ui_width = max(time_width, date_width)
-        ui_height = time_height + date_height
+    def _create_faces(self, screen) -> list:
+        """ Creates the clock faces shown on the screen
 
-        self._date_segment_width = date_segment_width
-        self._date_xy = ((ui_width - date_width) // 2, 0)
-        self._time_segment_width = time_segment_width
-        self._time_xy = ((ui_width - time_width) // 2, date_height)
-        self._ui_size = (ui_width, ui_height)
+        Returns:
+            list: a (ClockFace, time supplier) pair for each face
+        """
+        return [(ClockFace(screen, (0, 0), self._color, self._time_segment_width), self._time_supplier)]
+
+    def _frame_delay(self) -> Optional[float]:
+        """ Gets the time in seconds until the next frame is due; None if it isn't known """
+        return self._frame_scheduler() if self._frame_scheduler else None
+
+    def _wait(self, clock) -> list:
+        """ Waits until the next frame is due, or an event arrives, and returns the pending events """
+        delay = self._frame_delay()
+        if delay is None:
+            clock.tick(FRAMES_PERS_SECOND)
+            return pygame.event.get()
+        # a timeout of 0 would wait indefinitely
+        event = pygame.event.wait(max(1, math.ceil(delay * 1000) + FRAME_LATENESS_MS))
+        events = pygame.event.get()
+        if event.type != pygame.NOEVENT:
+            events.insert(0, event)
+        return events
 
     def run(self):
         """ Runs a loop to poll the current date and time from the chronometer
             and display it using a pygame screen.
+
+            The screen is cleared once; after that, each frame redraws only the characters
+            whose values have changed and updates only their areas of the display, so a
+            frame in which the displayed time hasn't changed draws nothing at all.
+
+            With a frame scheduler, the loop sleeps until the displayed second changes (or
+            an event arrives), so it wakes about once a second and shows each new second
+            within a millisecond or so of its start.
         """
         pygame.init()
         screen = pygame.display.set_mode(self._ui_size)
         pygame.display.set_caption(self._title)
         clock = pygame.time.Clock()
-        date_display = DateDisplay(screen, self._date_xy, self._date_segment_width, self._color)
-        time_display = TimeDisplay(screen, self._time_xy, self._time_segment_width, self._color)
+        faces = self._create_faces(screen)
+        screen.fill(0)
+        pygame.display.update()
         
         run = True
         while run:
-            clock.tick(FRAMES_PERS_SECOND)
-            for event in pygame.event.get():
+            exposed = False
+            for event in self._wait(clock):
                 if event.type == pygame.QUIT:
                     run = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    exposed = True
 
-            screen.fill(0)
-            instant = self._time_supplier()
-            if instant:
-                date_display.draw(instant.year, instant.month_name, instant.day_of_month, instant.day_name)
-                time_display.draw(instant.hour, instant.minute, instant.second)
-            pygame.display.update()
\ No newline at end of file
+            areas = []
+            for face, time_supplier in faces:
+                instant = time_supplier()
+                if instant:
+                    areas += face.draw(instant)
+            if areas and not exposed:
+                pygame.display.update(areas)
+            if exposed:
+                pygame.display.update()
\ No newline at end of file
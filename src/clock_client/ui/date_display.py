@@ -80,6 +80,16 @@ class DateDisplay:
         x += char_width + char_space
         self._year_right = led.Display7Segment(surface, (x, y), segment_width, color)
 
+        self._parts = (*self._day_of_week, *self._month, self._day_of_month_left, self._day_of_month_right,
+                       self._century_left, self._century_right, self._year_left, self._year_right)
+        self._shown = None
+
+    def invalidate(self):
+        """ Forgets what the display shows, so that the next draw redraws all of it """
+        self._shown = None
+        for part in self._parts:
+            part.invalidate()
+
     def draw(self, year: int, month: str, day_of_month: str, day_of_week: str):
         """ Draws the date display on the configured pygame surface.
 
@@ -88,23 +98,34 @@ class DateDisplay:
             month: month abbreviation (3 uppercase letters)
             day_of_month: day of the month [1..31]
             day_of_week: day of week abbreviation (3 uppercase letters)
+
+        Returns:
+            the areas of the surface that were drawn: only the characters that changed,
+            so none unless the date has changed
         """
+        date = (year, month, day_of_month, day_of_week)
+        if date == self._shown:
+            return []
+        self._shown = date
+
         assert len(month) == 3
         assert len(day_of_week) == 3
         
+        areas = []
         for i, letter in enumerate(day_of_week):
-            self._day_of_week[i].draw(letter)
+            areas.append(self._day_of_week[i].draw(letter))
         
         for i, letter in enumerate(month):
-            self._month[i].draw(letter)
+            areas.append(self._month[i].draw(letter))
 
-        self._day_of_month_left.draw(day_of_month // 10)        
-        self._day_of_month_right.draw(day_of_month % 10)        
+        areas.append(self._day_of_month_left.draw(day_of_month // 10))
+        areas.append(self._day_of_month_right.draw(day_of_month % 10))
 
         century = year // 100
         year = year % 100
-        self._century_left.draw(century // 10)
-        self._century_right.draw(century % 10)
-        self._year_left.draw(year // 10)
-        self._year_right.draw(year % 10)
+        areas.append(self._century_left.draw(century // 10))
+        areas.append(self._century_right.draw(century % 10))
+        areas.append(self._year_left.draw(year // 10))
+        areas.append(self._year_right.draw(year % 10))
+        return [area for area in areas if area]
         
\ No newline at end of file
@@ -93,6 +93,70 @@ def word_space(segment_width):
     return 3 * char_space(segment_width)
 
 
+class GlyphCache:
+    """ A cache of pre-rendered LED characters.
+        Each character of a display type (every pattern, plus the blank display) is drawn
+        once per segment width and color on a surface of its own, so that drawing a
+        character on a display is a single blit rather than a polygon fill per segment.
+        Displays of the same type, size and color drawing on surfaces of the same pixel
+        format share one set of glyphs.
+    """
+
+    def __init__(self):
+        self._glyphs = {}
+
+    def __len__(self):
+        return len(self._glyphs)
+
+    def glyphs(self, display_type, segment_width, color, surface=None):
+        """ Gets the glyphs for a display type, segment width and color, rendering them if needed.
+
+        Args:
+            display_type: Display7Segment or Display14Segment
+            segment_width: LED segment width
+            color: a color name key as defined in COLORS
+            surface: the surface the glyphs will be drawn on; glyphs are rendered in its
+                pixel format, so that blitting them needs no conversion
+
+        Returns:
+            a tuple of surfaces, one for each of the display type's patterns followed by
+            one for the blank display
+        """
+        key = (display_type, segment_width, color, _pixel_format(surface))
+        glyphs = self._glyphs.get(key)
+        if glyphs is None:
+            glyphs = self._glyphs[key] = self._render(display_type, segment_width, color, surface)
+        return glyphs
+
+    @staticmethod
+    def _render(display_type, segment_width, color, surface):
+        segments = display_type.segments(segment_width)
+        # one extra pixel, since polygon edges are drawn inclusive of their end points
+        size = (char_width(segment_width) + 1, char_height(segment_width) + 1)
+        glyphs = []
+        for pattern in display_type._PATTERNS + ((0,) * len(segments),):
+            if surface is not None:
+                glyph = pygame.Surface(size, surface.get_flags() & pygame.SRCALPHA, surface)
+            else:
+                glyph = pygame.Surface(size)
+            glyph.fill(0)
+            for segment, on in zip(segments, pattern):
+                pygame.draw.polygon(glyph, COLORS[color][on], segment)
+            glyphs.append(glyph)
+        return tuple(glyphs)
+
+
+def _pixel_format(surface):
+    """ Gets a hashable description of a surface's pixel format; None for no surface """
+    if surface is None:
+        return None
+    return (surface.get_bitsize(), surface.get_masks(), surface.get_flags() & pygame.SRCALPHA)
+
+
+# The glyph cache shared by all displays that aren't given one of their own
+GLYPHS = GlyphCache()
+
+
 class Display7Segment:
     """ Simulates a common 7-segment LED display """
 
@@ -115,7 +179,7 @@ class Display7Segment:
         (1, 1, 1, 1, 0, 1, 1),   # digit 9
     )    
 
-    def __init__(self, surface, xy, segment_width, color):
+    def __init__(self, surface, xy, segment_width, color, glyphs: GlyphCache = None):
         """ Initializes a 7-segment display instance.
 
         Args:
@@ -123,17 +187,23 @@ class Display7Segment:
             xy: pygame coordinate pair (2-tuple or vector) for the top level corner
             segment_width: desired LED segment width
             color: a color name key as defined in COLORS
+            glyphs: the glyph cache to draw from; the shared GLYPHS cache by default
         """
         assert color in COLORS, "invalid color"
         self._surface = surface
         self._xy = xy
         self._color = color
+        self._glyphs = (glyphs if glyphs is not None else GLYPHS).glyphs(Display7Segment, segment_width, color, surface)
+        self._shown = None
 
+    @classmethod
+    def segments(cls, segment_width):
+        """ Produces the polygon for each of segments A..G, relative to the top left corner """
         segment_len = segment_length(segment_width)
         horizontal_segment = _horizontal_segment(segment_width, segment_len)
         vertical_segment = _vertical_segment(segment_width, segment_len)
 
-        self._segments = (
+        return (
             _translate_polygon(horizontal_segment, (segment_width, 0)),
             _translate_polygon(vertical_segment, (segment_width + segment_len, segment_width)),
             _translate_polygon(vertical_segment, (segment_width + segment_len, 2*segment_width + segment_len)),
@@ -143,22 +213,25 @@ class Display7Segment:
             _translate_polygon(horizontal_segment, (segment_width, segment_width + segment_len)),
         )
     
+    def invalidate(self):
+        """ Forgets what the display shows, so that the next draw redraws it (e.g. after the surface is cleared) """
+        self._shown = None
+
     def draw(self, value: int):
         """ Draws the 7-segment display that corresponds to the given value
 
         Args:
             value (int): the value (modulo 10) to be displayed; blank display if None
+
+        Returns:
+            the area of the surface that was drawn; None if the display already showed the value
         """
-        if value is not None:
-            value %= 10
-            for i, on in enumerate(self._PATTERNS[value]):
-                points = [pygame.math.Vector2(x,y) + self._xy for x, y in self._segments[i]]
-                pygame.draw.polygon(self._surface, COLORS[self._color][on], points)
-        else:
-            for position in self._segments:
-                points = [pygame.math.Vector2(x,y) + self._xy for x, y in position]
-                pygame.draw.polygon(self._surface, COLORS[self._color][0], points)
-            
+        glyph = self._glyphs[-1] if value is None else self._glyphs[value % 10]
+        if glyph is self._shown:
+            return None
+        self._shown = glyph
+        return self._surface.blit(glyph, self._xy)
+
 
 class Display14Segment:
     """ Simulates a common 14-segment LED display """
@@ -200,7 +273,7 @@ class Display14Segment:
         (1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1),    # letter Z
     )    
 
-    def __init__(self, surface, xy, segment_width, color):
+    def __init__(self, surface, xy, segment_width, color, glyphs: GlyphCache = None):
         """ Initializes a 14-segment display instance.
 
         Args:
@@ -208,18 +281,24 @@ class Display14Segment:
             xy: pygame coordinate pair (2-tuple or vector) for the top level corner
             segment_width: desired LED segment width
             color: a color name key as defined in COLORS
+            glyphs: the glyph cache to draw from; the shared GLYPHS cache by default
         """
         assert color in COLORS, "invalid color"
         self._surface = surface
         self._xy = xy
         self._color = color
+        self._glyphs = (glyphs if glyphs is not None else GLYPHS).glyphs(Display14Segment, segment_width, color, surface)
+        self._shown = None
 
+    @classmethod
+    def segments(cls, segment_width):
+        """ Produces the polygon for each of segments A..M, relative to the top left corner """
         segment_len = segment_length(segment_width)
         horizontal_segment = _horizontal_segment(segment_width, segment_len)
         half_segment = _horizontal_segment(segment_width, segment_len / 2)
         vertical_segment = _vertical_segment(segment_width, segment_len)
 
-        self._segments = (
+        return (
             _translate_polygon(horizontal_segment, (segment_width, 0)),
             _translate_polygon(vertical_segment, (segment_width + segment_len, segment_width)),
             _translate_polygon(vertical_segment, (segment_width + segment_len, 2*segment_width + segment_len)),
@@ -242,6 +321,10 @@ class Display14Segment:
                                (segment_width, 2*segment_width + segment_len)),
         )
 
+    def invalidate(self):
+        """ Forgets what the display shows, so that the next draw redraws it (e.g. after the surface is cleared) """
+        self._shown = None
+
     def draw(self, value):
         """ Draws the 14-segment display that corresponds to the given value
 
@@ -249,10 +332,13 @@ class Display14Segment:
             value (int or str): the value to be displayed; if an int, it is interpreted as 
                 an index the into the set of patterns; if a non-empty string, the first 
                 character of the string must be a letter A..Z; blank display if None or empty string
+
+        Returns:
+            the area of the surface that was drawn; None if the display already showed the value
         """
 
         if isinstance(value, str):
-            if str:
+            if value:
                 value = ord(value[0])
                 if value < ord('A') or value > ord('Z'):
                     raise ValueError("requires a letter from A..Z")
@@ -260,18 +346,11 @@ class Display14Segment:
             else:
                 value = None
     
-        if value is not None:
-            value %= 26
-            for i, on in enumerate(self._PATTERNS[value]):
-                segment = self._segments[i]
-                if segment:
-                    points = [pygame.math.Vector2(x,y) + self._xy for x, y in segment]
-                    pygame.draw.polygon(self._surface, COLORS[self._color][on], points)
-        else:
-            for segment in self._segments:
-                if segment:
-                    points = [pygame.math.Vector2(x,y) + self._xy for x, y in segment]
-                    pygame.draw.polygon(self._surface, COLORS[self._color][0], points)
+        glyph = self._glyphs[-1] if value is None else self._glyphs[value % 26]
+        if glyph is self._shown:
+            return None
+        self._shown = glyph
+        return self._surface.blit(glyph, self._xy)
 
 
 class Colon:
@@ -294,10 +373,23 @@ class Colon:
         self._xy = (xy[0], xy[1] + dy)
         self._on = on
         self._color = color
-        
+        self._shown = False
+
+    def invalidate(self):
+        """ Forgets that the colon was drawn, so that the next draw redraws it (e.g. after the surface is cleared) """
+        self._shown = False
+
     def draw(self):
-        """ Draws the colon on the configured surface """
+        """ Draws the colon on the configured surface
+
+        Returns:
+            the area of the surface that was drawn; None if the colon was already drawn
+        """
+        if self._shown:
+            return None
+        self._shown = True
         square = pygame.Rect(0, 0, self.segment_width, self.segment_width)
-        pygame.draw.rect(self._surface, COLORS[self._color][self._on], square.move(self._xy))
-        pygame.draw.rect(self._surface, COLORS[self._color][self._on], 
-                         square.move((self._xy[0], self._xy[1] + 3*self.segment_width)))
\ No newline at end of file
+        top = pygame.draw.rect(self._surface, COLORS[self._color][self._on], square.move(self._xy))
+        bottom = pygame.draw.rect(self._surface, COLORS[self._color][self._on], 
+                                  square.move((self._xy[0], self._xy[1] + 3*self.segment_width)))
+        return top.union(bottom)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import pygame
+
+from .clock import ClockFace
+
+
+class OffscreenClock:
+    """ A clock display drawn on an in-memory surface rather than in a window.
+        Nothing here touches pygame's display module, so it renders on a machine with no
+        video driver (a headless build box, or a server rendering displays for a kiosk),
+        and each frame can be exported as a raw pixel buffer or an image file.
+    """
+
+    def __init__(self, color: str, time_segment_width: int, surface=None):
+        """ Initializes an offscreen clock.
+
+        Args:
+            color (str): color for the simulated LED display (see led.COLORS for names)
+            time_segment_width (int): desired segment width for the time display
+            surface (optional): the surface to draw on; a new surface of the clock's size
+                by default
+        """
+        self.surface = surface if surface is not None else pygame.Surface(ClockFace.size(time_segment_width))
+        self.surface.fill(0)
+        self._face = ClockFace(self.surface, (0, 0), color, time_segment_width)
+
+    @property
+    def size(self) -> tuple:
+        """ Gets the size (width, height) of the rendered frames """
+        return self.surface.get_size()
+
+    def render(self, instant, full: bool = False) -> list:
+        """ Renders a date and time of day (see ClockUI for the attributes it must have).
+
+        Args:
+            instant: the date and time to render; nothing is drawn if None
+            full (bool, optional): clear the surface and redraw every character, rather
+                than only the characters that changed since the last frame
+
+        Returns:
+            list: the areas of the surface that were drawn
+        """
+        if full:
+            self.surface.fill(0)
+            self._face.invalidate()
+        return self._face.draw(instant) if instant else []
+
+    def to_bytes(self, format: str = "RGB") -> bytes:
+        """ Exports the current frame as a raw pixel buffer, row by row from the top left.
+
+        Args:
+            format (str, optional): a pixel format accepted by pygame.image.tobytes
+                (e.g. "RGB", "RGBA", "ARGB")
+        """
+        return pygame.image.tobytes(self.surface, format)
+
+    def save(self, filename: str):
+        """ Saves the current frame as an image file; the type (e.g. PNG or BMP) is chosen by the extension """
+        pygame.image.save(self.surface, filename)
@@ -64,6 +64,14 @@ class TimeDisplay:
         x += digit_width + digit_space
         self._second_right = led.Display7Segment(surface, (x, y), segment_width, color)
 
+        self._parts = (self._hour_left, self._hour_right, self._colon_left, self._minute_left,
+                       self._minute_right, self._colon_right, self._second_left, self._second_right)
+
+    def invalidate(self):
+        """ Forgets what the display shows, so that the next draw redraws all of it """
+        for part in self._parts:
+            part.invalidate()
+
     def draw(self, hour: int, minute: int, second: int):
         """ Draws the time display on the configured pygame surface.
 
@@ -71,13 +79,19 @@ class TimeDisplay:
             hour (int): hour number [0..23]
             minute (int): minute number [0..59]
             second (int): second number [0..59]
+
+        Returns:
+            the areas of the surface that were drawn: only the characters that changed
         """
-        self._hour_left.draw(hour // 10 if hour // 10 else None)
-        self._hour_right.draw(hour % 10)
-        self._colon_left.draw()
-        self._minute_left.draw(minute // 10)
-        self._minute_right.draw(minute % 10)
-        self._colon_right.draw()
-        self._second_left.draw(second // 10)
-        self._second_right.draw(second % 10)
+        areas = (
+            self._hour_left.draw(hour // 10 if hour // 10 else None),
+            self._hour_right.draw(hour % 10),
+            self._colon_left.draw(),
+            self._minute_left.draw(minute // 10),
+            self._minute_right.draw(minute % 10),
+            self._colon_right.draw(),
+            self._second_left.draw(second // 10),
+            self._second_right.draw(second % 10),
+        )
+        return [area for area in areas if area]
         
\ No newline at end of file
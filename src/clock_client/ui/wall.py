@@ -0,0 +1,58 @@
+import math
+
+from typing import Callable, Any, Optional, Sequence
+
+from .clock import ClockFace, ClockUI
+
+# Space (in pixels) around each panel of a clock wall
+PANEL_GAP = 16
+
+
+class ClockWall(ClockUI):
+    """ A wall of clock panels in one window.
+        All panels are drawn on one surface by one render loop: each frame redraws only
+        the characters that changed on any panel, and the loop sleeps until the next
+        displayed second on any panel. Panels of the same size and color share the same
+        glyphs (see led.GlyphCache), so the memory for the glyphs doesn't grow with the
+        number of panels.
+    """
+
+    def __init__(self, time_suppliers: Sequence[Callable[[], Any]], color: str, time_segment_width: int,
+                 title: str, frame_schedulers: Sequence[Callable[[], Optional[float]]] = None,
+                 columns: int = None):
+        """ Initializes a clock wall.
+
+        Args:
+            time_suppliers (Sequence[Callable[[], Any]]): a function for each panel that
+                returns the date and time to show (see ClockUI)
+            color (str): color for the simulated LED displays (see led.COLORS for names)
+            time_segment_width (int): desired segment width for the time displays
+            title (str): title for the UI window
+            frame_schedulers (Sequence[Callable[[], Optional[float]]], optional): a function
+                for each panel that returns the time in seconds until its displayed second
+                next changes (see ClockUI)
+            columns (int, optional): number of columns of panels; by default, the panels
+                are laid out in a grid that is as nearly square as possible
+        """
+        super().__init__(None, color, time_segment_width, title)
+        self._time_suppliers = list(time_suppliers)
+        self._frame_schedulers = list(frame_schedulers or ())
+        count = len(self._time_suppliers)
+        self._columns = max(1, min(count, columns or math.ceil(math.sqrt(count))))
+        rows = max(1, math.ceil(count / self._columns))
+        width, height = ClockFace.size(time_segment_width)
+        self._panel_size = (width + PANEL_GAP, height + PANEL_GAP)
+        self._ui_size = (self._columns * self._panel_size[0] + PANEL_GAP, rows * self._panel_size[1] + PANEL_GAP)
+
+    def panel_xy(self, index: int) -> tuple:
+        """ Gets the top left corner of a panel """
+        row, column = divmod(index, self._columns)
+        return (PANEL_GAP + column * self._panel_size[0], PANEL_GAP + row * self._panel_size[1])
+
+    def _create_faces(self, screen) -> list:
+        return [(ClockFace(screen, self.panel_xy(i), self._color, self._time_segment_width), time_supplier)
+                for i, time_supplier in enumerate(self._time_suppliers)]
+
+    def _frame_delay(self) -> Optional[float]:
+        delays = [delay for delay in (scheduler() for scheduler in self._frame_schedulers) if delay is not None]
+        return min(delays) if delays else None
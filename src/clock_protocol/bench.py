@@ -0,0 +1,44 @@
+""" Microbenchmark for the TLV decoder.
+
+    Measures the cost of decoding one datagram as seen by each side of the protocol:
+    the server decoding a client's HELLO, and the client decoding the server's
+    HELLO reply and periodic DATE/TIME broadcast.
+
+    Usage: python3 -m clock_protocol.bench [-n ITERATIONS]
+"""
+import argparse
+import timeit
+
+from .tlv import read_fields
+
+DATAGRAMS = (
+    ("server", "client HELLO", bytes.fromhex("00")),
+    ("client", "HELLO reply", bytes.fromhex("020078")),
+    ("client", "HELLO+DATE+TIME", bytes.fromhex("020078" "1403261017" "2413070945")),
+    ("client", "DATE+TIME broadcast", bytes.fromhex("1403261017" "2413070945")),
+    ("client", "DATE+TIME+MICROSECOND broadcast", bytes.fromhex("1403261017" "2413070945" "3306e93a")),
+)
+
+DEFAULT_ITERATIONS = 200000
+
+
+def decode(data: bytes):
+    """ Decodes every field of a datagram, as the server and client do """
+    for _ in read_fields(data):
+        pass
+
+
+def run(iterations: int):
+    """ Times the decoder on each sample datagram and prints the per-datagram cost """
+    print(f"{'side':<8}{'datagram':<32}{'octets':>8}{'ns/datagram':>14}")
+    for side, name, data in DATAGRAMS:
+        best = min(timeit.repeat(lambda: decode(data), number=iterations, repeat=5))
+        print(f"{side:<8}{name:<32}{len(data):>8}{best / iterations * 1e9:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.prog = "clock_protocol.bench"
+    parser.add_argument("-n", "--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="number of datagrams decoded per timing run")
+    run(parser.parse_args().iterations)
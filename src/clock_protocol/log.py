@@ -0,0 +1,126 @@
+""" Logging configuration shared by the server and the client.
+
+    Per-packet code paths log through a SampledLogger, which checks the level before
+    doing anything else and passes only one in every N records on to the logging
+    framework, with %-style arguments so that messages are formatted only if they are
+    emitted. Every record, per-packet or not, then goes through a RateLimitFilter on
+    the handler, which caps the number of records per second from each call site.
+"""
+import logging
+import sys
+import time
+
+from typing import Dict, Tuple
+
+# Logging modes selectable from the command line, and the level of each
+LOG_MODES = {
+    "quiet": logging.WARNING,
+    "info": logging.INFO,
+    "debug": logging.DEBUG,
+}
+DEFAULT_LOG_MODE = "quiet"
+
+# Maximum number of records per second from each call site (0 for no limit)
+DEFAULT_RATE_LIMIT = 10.0
+
+# One in every DEFAULT_SAMPLE_RATE records on the per-packet paths is logged
+DEFAULT_SAMPLE_RATE = 100
+
+FORMAT = "%(asctime)s %(levelname)s %(threadName)s %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """ Limits the rate of records from each call site with a token bucket.
+        When records have been dropped, the next record that passes reports how many.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, burst: float = None):
+        """ Initializes a filter.
+
+        Args:
+            rate (float, optional): records per second allowed from each call site
+            burst (float, optional): records that may be logged in a burst; the rate by default
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        # call site -> [tokens, time of last update, records dropped]
+        self._buckets: Dict[Tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.get((record.pathname, record.lineno))
+        if bucket is None:
+            bucket = self._buckets[(record.pathname, record.lineno)] = [self.burst, now, 0]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1.0:
+            bucket[0] = tokens
+            bucket[2] += 1
+            return False
+        bucket[0] = tokens - 1.0
+        if bucket[2]:
+            record.msg = f"{record.getMessage()} ({bucket[2]} similar messages suppressed)"
+            record.args = None
+            bucket[2] = 0
+        return True
+
+
+class SampledLogger:
+    """ A logger for per-packet code paths that logs one in every N records.
+        The sample rate is shared by all sampled loggers and set by `configure`.
+    """
+
+    sample_rate = 1
+
+    __slots__ = ("logger", "_count")
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self._count = 0
+
+    def _sampled(self, level: int) -> bool:
+        if not self.logger.isEnabledFor(level):
+            return False
+        self._count += 1
+        return self._count % SampledLogger.sample_rate == 0
+
+    def debug(self, message: str, *args):
+        if self._sampled(logging.DEBUG):
+            self.logger.debug(message, *args, stacklevel=2)
+
+    def info(self, message: str, *args):
+        if self._sampled(logging.INFO):
+            self.logger.info(message, *args, stacklevel=2)
+
+
+class Hex:
+    """ Formats bytes as hexadecimal when (and only if) a log record is emitted """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return bytes(self.data).hex()
+
+
+def configure(mode: str = DEFAULT_LOG_MODE, rate_limit: float = DEFAULT_RATE_LIMIT,
+              sample_rate: int = DEFAULT_SAMPLE_RATE, stream=sys.stdout, format: str = FORMAT):
+    """ Configures logging for a program.
+
+    Args:
+        mode (str, optional): one of the LOG_MODES; quiet (warnings and errors only) by default
+        rate_limit (float, optional): maximum records per second from each call site; 0 for no limit
+        sample_rate (int, optional): one in this many records is logged on per-packet paths
+        stream (optional): the stream to which records are written
+        format (str, optional): the format of each record
+    """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(format))
+    handler.addFilter(RateLimitFilter(rate_limit))
+    logging.basicConfig(level=LOG_MODES[mode], handlers=[handler], force=True)
+    SampledLogger.sample_rate = max(1, sample_rate)
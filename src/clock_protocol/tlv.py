@@ -0,0 +1,150 @@
+from typing import ByteString, Iterator, NamedTuple, Optional, Union
+
+BASE_YEAR = 2000
+
+TAG_HELLO = 0
+TAG_DATE = 1
+TAG_TIME = 2
+TAG_MICROSECOND = 3
+
+LENGTH_HELLO = 2
+LENGTH_DATE = 4
+LENGTH_TIME = 4
+LENGTH_MICROSECOND = 3
+
+MICROSECONDS_PER_CENTI = 10000
+
+# Each field starts with a one-octet header: the tag in the upper nibble and the
+# length of the value in the lower nibble.
+TAG_SHIFT = 4
+LENGTH_MASK = 0x0F
+
+# Decoded value of each packed BCD octet; None if either nibble is not a decimal digit
+_BCD = tuple((hi * 10 + lo) if hi < 10 and lo < 10 else None
+             for hi in range(16) for lo in range(16))
+
+
+class HelloField(NamedTuple):
+    """ A HELLO field; a client's HELLO carries no value, so its dead interval is None """
+    dead_interval: Optional[int]
+
+
+class DateField(NamedTuple):
+    """ A DATE field """
+    year: int
+    month: int
+    day: int
+    week_day: int
+
+
+class TimeField(NamedTuple):
+    """ A TIME field """
+    hour: int
+    minute: int
+    second: int
+    centi: int
+
+
+class MicrosecondField(NamedTuple):
+    """ A MICROSECOND field: the microsecond within the second of the TIME field that it
+        accompanies, which refines the TIME field's hundredths of a second
+    """
+    microsecond: int
+
+
+class UnknownField(NamedTuple):
+    """ A field with a tag that this implementation doesn't recognize """
+    tag: int
+    value: memoryview
+
+
+Field = Union[HelloField, DateField, TimeField, MicrosecondField, UnknownField]
+
+
+def header(tag: int, length: int) -> int:
+    """ Produces the header octet for a field with the given tag and value length """
+    return tag << TAG_SHIFT | length
+
+
+def encode_hello() -> bytes:
+    """ Encodes the HELLO message that a client sends to subscribe """
+    return bytes((header(TAG_HELLO, 0),))
+
+
+def _bcd(view: memoryview, index: int, name: str) -> int:
+    value = _BCD[view[index]]
+    if value is None:
+        raise ValueError(f"{name} octet {view[index]:#04x} is not packed BCD")
+    return value
+
+
+def _decode_hello(view: memoryview, start: int, length: int) -> HelloField:
+    if length == 0:
+        return HelloField(None)
+    if length != LENGTH_HELLO:
+        raise ValueError(f"HELLO field has length {length}; expected 0 or {LENGTH_HELLO}")
+    return HelloField(view[start] << 8 | view[start + 1])
+
+
+def _decode_date(view: memoryview, start: int, length: int) -> DateField:
+    if length != LENGTH_DATE:
+        raise ValueError(f"DATE field has length {length}; expected {LENGTH_DATE}")
+    flags = view[start]
+    century = (flags >> 3) & 0x1
+    week_day = flags & 0x7
+    if week_day > 6:
+        raise ValueError(f"DATE field has invalid day of week {week_day}")
+    year = BASE_YEAR + 100 * century + _bcd(view, start + 1, "year")
+    return DateField(year, _bcd(view, start + 2, "month"), _bcd(view, start + 3, "day"), week_day)
+
+
+def _decode_time(view: memoryview, start: int, length: int) -> TimeField:
+    if length != LENGTH_TIME:
+        raise ValueError(f"TIME field has length {length}; expected {LENGTH_TIME}")
+    return TimeField(_bcd(view, start, "hour"), _bcd(view, start + 1, "minute"),
+                     _bcd(view, start + 2, "second"), _bcd(view, start + 3, "centi"))
+
+
+def _decode_microsecond(view: memoryview, start: int, length: int) -> MicrosecondField:
+    if length != LENGTH_MICROSECOND:
+        raise ValueError(f"MICROSECOND field has length {length}; expected {LENGTH_MICROSECOND}")
+    microsecond = view[start] << 16 | view[start + 1] << 8 | view[start + 2]
+    if microsecond >= 1000000:
+        raise ValueError(f"MICROSECOND field has invalid value {microsecond}")
+    return MicrosecondField(microsecond)
+
+
+_DECODERS = {
+    TAG_HELLO: _decode_hello,
+    TAG_DATE: _decode_date,
+    TAG_TIME: _decode_time,
+    TAG_MICROSECOND: _decode_microsecond,
+}
+
+
+def read_fields(data: ByteString) -> Iterator[Field]:
+    """ Decodes the fields of a message without copying the underlying buffer.
+
+    Args:
+        data (ByteString): the received datagram
+
+    Yields:
+        Field: a typed record for each field in the message
+
+    Raises:
+        ValueError: if a field is truncated, has a length that doesn't match its tag,
+            or contains an invalid value
+    """
+    view = memoryview(data)
+    size = len(view)
+    index = 0
+    while index < size:
+        octet = view[index]
+        tag = octet >> TAG_SHIFT
+        length = octet & LENGTH_MASK
+        start = index + 1
+        index = start + length
+        if index > size:
+            raise ValueError(f"tag {tag} length {length} has short value ({size - start} octets)")
+        decoder = _DECODERS.get(tag)
+        yield decoder(view, start, length) if decoder else UnknownField(tag, view[start:index])
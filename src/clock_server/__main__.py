@@ -1,15 +1,24 @@
 import argparse
-import logging
-import sys
 
-from .repository import SubscriberRepository
+from clock_protocol import log
+from .async_server import AsyncClockServer
+from .fanout import DEFAULT_BATCH_SIZE, FanoutEngine
+from .metrics import DEFAULT_SAMPLE_RATE, METRICS_IP, MetricsServer, Registry, instrument_repository, instrument_server
+from .repository import DEFAULT_FLUSH_INTERVAL, SubscriberRepository
 from .server import ClockServer
+from .storage import DEFAULT_COMPACT_THRESHOLD, STORAGE_FORMATS, JournalStorage
+from .workers import Coordinator
 
 LOCAL_IP = "127.0.0.1"
 LOCAL_PORT = 10010
 DEAD_INTERVAL_SECONDS = 120
 REFRESH_INTERVAL_SECONDS = 30
 
+ENGINES = {
+    "thread": ClockServer,
+    "asyncio": AsyncClockServer,
+}
+
 
 def parse_cli():
     """ Parses and validates command line arguments """
@@ -21,7 +30,33 @@ def parse_cli():
                         help="interval at which subscribers are required to send HELLO messages")
     parser.add_argument("-r", "--refresh-interval", type=float, default=REFRESH_INTERVAL_SECONDS, 
                         help="interval at which date/time updates will be sent to all subscribers")
-    parser.add_argument("-D", "--debug", action="store_true", help="enable debug logging")
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="number of datagrams sent per batch when broadcasting to subscribers")
+    parser.add_argument("--no-sendmmsg", action="store_true", help="broadcast using sendto even if sendmmsg is available")
+    parser.add_argument("-e", "--engine", choices=sorted(ENGINES.keys()), default="thread",
+                        help="server engine; a receive thread with a refresh timer, or a single asyncio event loop")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of server processes sharing the port (SO_REUSEPORT); each serves a shard of subscribers")
+    parser.add_argument("-f", "--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="minimum interval at which changes to the subscriber database are saved")
+    parser.add_argument("-s", "--storage", choices=sorted(STORAGE_FORMATS.keys()), default="json",
+                        help="subscriber database format; a JSON file rewritten on each save, a snapshot plus an append-only journal, "
+                             "or an SQLite database")
+    parser.add_argument("--compact-threshold", type=int, default=DEFAULT_COMPACT_THRESHOLD,
+                        help="journal size in bytes beyond which the journal is compacted into a new snapshot")
+    parser.add_argument("-m", "--metrics-port", type=int, default=None,
+                        help="TCP port on which to serve metrics (Prometheus text format at /metrics); disabled by default")
+    parser.add_argument("--metrics-interface", type=str, default=METRICS_IP,
+                        help="address of network interface on which to serve metrics")
+    parser.add_argument("--metrics-sample-rate", type=int, default=DEFAULT_SAMPLE_RATE,
+                        help="time one in this many calls of each instrumented method")
+    parser.add_argument("-l", "--log", choices=list(log.LOG_MODES.keys()), default=log.DEFAULT_LOG_MODE,
+                        help="logging mode; quiet logs only warnings and errors")
+    parser.add_argument("--log-rate", type=float, default=log.DEFAULT_RATE_LIMIT,
+                        help="maximum log records per second from each call site (0 for no limit)")
+    parser.add_argument("--log-sample", type=int, default=log.DEFAULT_SAMPLE_RATE,
+                        help="log one in this many records on per-packet paths")
+    parser.add_argument("-D", "--debug", action="store_true", help="enable debug logging (same as --log debug)")
     parser.add_argument("--ref", action="store_true", help="enable reference implementation")
     parser.add_argument("output_file", type=str, help="directory path for subscriber database")
     return parser.parse_args()
@@ -29,12 +64,31 @@ def parse_cli():
 
 if __name__ == "__main__":
     args = parse_cli()
-    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if args.debug else logging.INFO,
-                        format="%(asctime)s %(levelname)s %(threadName)s %(message)s")
+    log_args = ("debug" if args.debug else args.log, args.log_rate, args.log_sample)
+    log.configure(*log_args)
     
-    subscriber_repository = SubscriberRepository(args.output_file)
+    if args.storage == "journal":
+        storage = JournalStorage(args.output_file, args.dead_interval, args.compact_threshold)
+    else:
+        storage = STORAGE_FORMATS[args.storage](args.output_file, args.dead_interval)
+    subscriber_repository = SubscriberRepository(args.output_file, args.flush_interval, storage)
     
-    server = ClockServer(args.interface, args.port, args.dead_interval, args.refresh_interval, 
-                         subscriber_repository)
+    server_args = (args.interface, args.port, args.dead_interval, args.refresh_interval)
+    fanout_args = (args.batch_size, not args.no_sendmmsg)
+
+    metrics_args = None
+    if args.metrics_port is not None:
+        metrics_args = (args.metrics_interface, args.metrics_port, args.metrics_sample_rate)
+
+    if args.workers > 1:
+        server = Coordinator(args.workers, ENGINES[args.engine], server_args, fanout_args, subscriber_repository,
+                             metrics_args, log_args)
+    else:
+        server = ENGINES[args.engine](*server_args, subscriber_repository, FanoutEngine(*fanout_args))
+        if metrics_args is not None:
+            registry = Registry(args.metrics_sample_rate)
+            instrument_server(registry, server)
+            instrument_repository(registry, subscriber_repository)
+            MetricsServer(registry, args.metrics_interface, args.metrics_port).start()
     
     server.run()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import asyncio
+import contextlib
+import datetime
+import logging
+
+from .message import encode_datetime
+from .server import ClockServer
+
+logger = logging.getLogger(__name__)
+
+# Interval between passes of the subscriber aging coroutine
+AGING_INTERVAL_SECONDS = 1.0
+
+
+class _ServerProtocol(asyncio.DatagramProtocol):
+    """ Delivers datagrams received on the server's socket to the server """
+
+    def __init__(self, server: "AsyncClockServer"):
+        self._server = server
+
+    def datagram_received(self, data: bytes, address: tuple):
+        self._server.handle_input(data, address)
+
+    def error_received(self, exc: Exception):
+        logger.error(f"receive error: {exc}")
+
+
+class AsyncClockServer(ClockServer):
+    """ A clock server that runs on a single asyncio event loop.
+        Receiving HELLOs, the periodic date and time broadcast, and subscriber aging
+        all run as tasks on the same loop, so the server's state needs no lock and
+        no timer threads are created.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """ Initializes a server instance; accepts the same arguments as ClockServer. """
+        super().__init__(*args, **kwargs)
+        # all state is confined to the event loop thread
+        self._lock = contextlib.nullcontext()
+        self._timer = None
+
+    def schedule(self):
+        """ Broadcasts are driven by the broadcast coroutine at a fixed period,
+            so new subscribers don't need to reschedule anything.
+        """
+
+    async def _broadcast_loop(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += self.refresh_interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            addresses = self._subscribers.snapshot()
+            if addresses:
+                message = encode_datetime(datetime.datetime.now())
+                self._report_broadcast(await self._fanout.broadcast_async(self.serv_sock, message, addresses))
+            if loop.time() > deadline + self.refresh_interval:
+                # fell behind by more than a whole period; don't try to catch up
+                deadline = loop.time()
+
+    async def _aging_loop(self):
+        while True:
+            await asyncio.sleep(AGING_INTERVAL_SECONDS)
+            self.expire()
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self.serv_sock = self._open_socket()
+        self.serv_sock.setblocking(False)
+        self.restore(self.subscriber_repository.start())
+        self.initialize()
+        transport, _ = await loop.create_datagram_endpoint(lambda: _ServerProtocol(self), sock=self.serv_sock)
+        logger.info(f"listening on {self.local_address}")
+        try:
+            await asyncio.gather(self._broadcast_loop(), self._aging_loop())
+        finally:
+            transport.close()
+
+    def run(self):
+        """ Run the server.
+            This method will be called from the main thread of the server program.
+            It runs the event loop until the program is interrupted.
+        """
+        try:
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
+            pass
+
+        self.subscriber_repository.stop()
@@ -0,0 +1,95 @@
+import math
+
+from typing import Dict, Hashable, List, Set
+
+# Width (in seconds) of each slot of the wheel
+DEFAULT_RESOLUTION = 0.25
+
+
+class ExpiryWheel:
+    """ A hashed timing wheel that tracks when each subscriber's subscription expires.
+
+        Each key is stored in the slot for the tick that contains its deadline. Scheduling,
+        rescheduling and removing a key are O(1), and expiring visits only the slots
+        that have elapsed since the previous call and the keys that are actually due.
+        A key is expired on the first call to `expire` at or after the end of its slot,
+        i.e. at most one resolution late.
+    """
+
+    def __init__(self, resolution: float = DEFAULT_RESOLUTION):
+        """ Initializes an empty wheel.
+
+        Args:
+            resolution (float, optional): width of each slot in seconds. Defaults to DEFAULT_RESOLUTION.
+        """
+        self.resolution = resolution
+        self._slots: Dict[int, Set[Hashable]] = {}
+        self._ticks: Dict[Hashable, int] = {}
+        self._last_tick: int = None
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._ticks
+
+    def _tick(self, t: float) -> int:
+        return math.floor(t / self.resolution)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """ Schedules (or reschedules) the given key to expire at a deadline.
+
+        Args:
+            key (Hashable): the key to schedule
+            deadline (float): the time at which the key expires
+        """
+        tick = self._tick(deadline)
+        if self._last_tick is not None and tick <= self._last_tick:
+            tick = self._last_tick + 1     # due on the next call to expire
+        old_tick = self._ticks.get(key)
+        if old_tick == tick:
+            return
+        if old_tick is not None:
+            self._remove_from_slot(key, old_tick)
+        self._ticks[key] = tick
+        self._slots.setdefault(tick, set()).add(key)
+
+    def remove(self, key: Hashable):
+        """ Removes the given key from the wheel, if present """
+        tick = self._ticks.pop(key, None)
+        if tick is not None:
+            self._remove_from_slot(key, tick)
+
+    def _remove_from_slot(self, key: Hashable, tick: int):
+        slot = self._slots[tick]
+        slot.discard(key)
+        if not slot:
+            del self._slots[tick]
+
+    def expire(self, now: float) -> List[Hashable]:
+        """ Removes and returns all keys whose slot ended at or before the given time.
+
+        Args:
+            now (float): the current time
+
+        Returns:
+            List[Hashable]: the expired keys
+        """
+        current = self._tick(now) - 1     # the last slot that has completely elapsed
+        if self._last_tick is not None and current <= self._last_tick:
+            return []
+        if self._last_tick is None or current - self._last_tick > len(self._slots):
+            # first pass, or more ticks have elapsed than there are occupied slots
+            ticks = sorted(tick for tick in self._slots if tick <= current)
+        else:
+            ticks = range(self._last_tick + 1, current + 1)
+
+        expired = []
+        for tick in ticks:
+            slot = self._slots.pop(tick, None)
+            if slot:
+                for key in slot:
+                    del self._ticks[key]
+                expired.extend(slot)
+        self._last_tick = current
+        return expired
@@ -0,0 +1,318 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import functools
+import logging
+import os
+import select
+import socket
+import time
+
+from socket import socket as Socket
+from typing import ByteString, Iterable, List, NamedTuple, Union
+
+from .table import SOCKADDR_SIZE, PackedAddresses, pack_sockaddr
+
+logger = logging.getLogger(__name__)
+
+# Number of datagrams handed to the kernel per batch. Between batches the engine
+# yields the GIL so that the receive loop can keep up with incoming HELLOs.
+DEFAULT_BATCH_SIZE = 1024
+
+# Upper bound on the number of encoded socket addresses that are kept for reuse
+ADDRESS_CACHE_SIZE = 1 << 17
+
+# When the socket's send buffer is full, the engine waits up to this long (in seconds) for
+# it to drain before it gives up on the rest of the broadcast
+SEND_WAIT_TIMEOUT = 1.0
+
+# Errors that mean the send buffer is full, rather than that the datagram can't be sent
+_WOULD_BLOCK = (errno.EAGAIN, errno.EWOULDBLOCK)
+
+
+class BroadcastStats(NamedTuple):
+    """ The outcome of a single broadcast """
+    sent: int
+    failed: int
+    duration: float
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p), ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_IOVec)), ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p), ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_sendmmsg():
+    """ Looks up the `sendmmsg` system call in the C library.
+
+    Returns:
+        the foreign function, or None if the platform does not provide it
+    """
+    if os.name != "posix":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    sendmmsg.argtypes = (ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int)
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+
+@functools.lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def _sockaddr(address: tuple) -> ctypes.Array:
+    """ Encodes an address tuple as a C `sockaddr_in` or `sockaddr_in6` structure """
+    raw = pack_sockaddr(address)
+    return ctypes.create_string_buffer(raw, len(raw))
+
+
+def _sized(addresses: Union[PackedAddresses, Iterable[tuple]]) -> Union[PackedAddresses, List[tuple]]:
+    return addresses if isinstance(addresses, (PackedAddresses, list)) else list(addresses)
+
+
+async def _writable(sock: Socket, timeout: float) -> bool:
+    """ Waits until a socket is writable; returns False if it isn't within the timeout.
+        The server never sends through its datagram transport, so the transport never
+        registers a writer of its own on the socket.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def ready():
+        if not future.done():
+            future.set_result(True)
+
+    loop.add_writer(sock.fileno(), ready)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        loop.remove_writer(sock.fileno())
+
+
+class FanoutEngine:
+    """ Sends the same datagram to many subscribers in batches.
+
+        On platforms that provide `sendmmsg` (Linux) each batch is handed to the kernel
+        with a single system call; elsewhere each batch is a tight `sendto` loop.
+
+        If the socket is non-blocking and its send buffer fills up, a batch stops at the
+        first datagram that couldn't be sent; the engine waits until the socket is writable
+        and resumes from that datagram, so only real errors count as failures.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, use_sendmmsg: bool = True):
+        """ Initializes a fan-out engine.
+
+        Args:
+            batch_size (int, optional): number of datagrams per batch. Defaults to DEFAULT_BATCH_SIZE.
+            use_sendmmsg (bool, optional): use `sendmmsg` if the platform provides it. Defaults to True.
+        """
+        self.batch_size = max(1, batch_size)
+        self._sendmmsg = _load_sendmmsg() if use_sendmmsg else None
+        logger.debug(f"fan-out engine using {'sendmmsg' if self._sendmmsg else 'sendto'}")
+
+    def broadcast(self, sock: Socket, message: ByteString, addresses: Union[PackedAddresses, Iterable[tuple]]) -> BroadcastStats:
+        """ Sends a message to each of the given addresses.
+
+        Args:
+            sock (Socket): the UDP socket on which to send the message
+            message (ByteString): the message to send
+            addresses (PackedAddresses or Iterable[tuple]): the subscriber addresses; a
+                snapshot of the subscriber table is sent without encoding each address
+
+        Returns:
+            BroadcastStats: number of datagrams sent and failed, and the elapsed time in seconds
+        """
+        start = time.perf_counter()
+        addresses = _sized(addresses)
+        sent = failed = 0
+        for batch_sent, batch_failed, blocked in self._send_batches(sock, message, addresses):
+            sent += batch_sent
+            failed += batch_failed
+            if not blocked:
+                time.sleep(0)    # let the receive thread run between batches
+            elif not select.select((), (sock,), (), SEND_WAIT_TIMEOUT)[1]:
+                failed += self._abandon(len(addresses) - sent - failed)
+                break
+        return BroadcastStats(sent, failed, time.perf_counter() - start)
+
+    async def broadcast_async(self, sock: Socket, message: ByteString, addresses: Union[PackedAddresses, Iterable[tuple]]) -> BroadcastStats:
+        """ Sends a message to each of the given addresses from a coroutine, yielding to
+            the event loop between batches so that incoming HELLOs are still serviced.
+
+        Args:
+            sock (Socket): the UDP socket on which to send the message
+            message (ByteString): the message to send
+            addresses (PackedAddresses or Iterable[tuple]): the subscriber addresses; a
+                snapshot of the subscriber table is sent without encoding each address
+
+        Returns:
+            BroadcastStats: number of datagrams sent and failed, and the elapsed time in seconds
+        """
+        start = time.perf_counter()
+        addresses = _sized(addresses)
+        sent = failed = 0
+        for batch_sent, batch_failed, blocked in self._send_batches(sock, message, addresses):
+            sent += batch_sent
+            failed += batch_failed
+            if not blocked:
+                await asyncio.sleep(0)
+            elif not await _writable(sock, SEND_WAIT_TIMEOUT):
+                failed += self._abandon(len(addresses) - sent - failed)
+                break
+        return BroadcastStats(sent, failed, time.perf_counter() - start)
+
+    @staticmethod
+    def _abandon(unsent: int) -> int:
+        logger.error(f"send buffer didn't drain within {SEND_WAIT_TIMEOUT} s; "
+                     f"{unsent} subscribers missed this broadcast")
+        return unsent
+
+    def _send_batches(self, sock: Socket, message: ByteString,
+                      addresses: Union[PackedAddresses, Iterable[tuple]]):
+        """ Sends the message one batch at a time, yielding the sent and failed counts for
+            each attempt and a flag that is True if the attempt stopped because the send
+            buffer was full. In that case the rest of the batch is sent when the caller
+            resumes the generator (after waiting for the socket to become writable).
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"broadcasting message: {bytes(message).hex()}")
+        use_sendmmsg = self._sendmmsg and sock.family in (socket.AF_INET, socket.AF_INET6)
+        if isinstance(addresses, PackedAddresses):
+            if use_sendmmsg:
+                sockaddrs = ctypes.create_string_buffer(addresses.sockaddrs, len(addresses.sockaddrs))
+                for i in range(0, len(addresses), self.batch_size):
+                    stop = min(i + self.batch_size, len(addresses))
+                    while True:
+                        sent, failed, remaining = self._send_packed_mmsg(sock, message, addresses,
+                                                                         ctypes.addressof(sockaddrs), i, stop)
+                        yield sent, failed, remaining > 0
+                        if not remaining:
+                            break
+                        i = stop - remaining
+                return
+            addresses = addresses.addresses
+        send_batch = self._send_batch_mmsg if use_sendmmsg else self._send_batch_sendto
+        for i in range(0, len(addresses), self.batch_size):
+            batch = addresses[i:i + self.batch_size]
+            while True:
+                sent, failed, remaining = send_batch(sock, message, batch)
+                yield sent, failed, remaining > 0
+                if not remaining:
+                    break
+                batch = batch[-remaining:]
+
+    def _send_batch_sendto(self, sock: Socket, message: ByteString, batch: List[tuple]):
+        """ Returns the number of datagrams sent and failed, and the number at the end of
+            the batch that weren't attempted because the send buffer was full
+        """
+        sent = failed = 0
+        sendto = sock.sendto
+        for i, address in enumerate(batch):
+            try:
+                sendto(message, address)
+                sent += 1
+            except BlockingIOError:
+                return sent, failed, len(batch) - i
+            except OSError as err:
+                failed += 1
+                logger.error(f"error sending message to subscriber {address}: {err}")
+        return sent, failed, 0
+
+    def _send_batch_mmsg(self, sock: Socket, message: ByteString, batch: List[tuple]):
+        """ Returns the number of datagrams sent and failed, and the number at the end of
+            the batch that weren't attempted because the send buffer was full
+        """
+        invalid = []
+        indices, destinations, names, namelens = [], [], [], []
+        for i, address in enumerate(batch):
+            try:
+                name = _sockaddr(address)
+            except (OSError, ValueError, OverflowError, TypeError) as err:
+                invalid.append(i)
+                logger.error(f"error sending message to subscriber {address}: {err}")
+                continue
+            indices.append(i)
+            destinations.append(address)
+            names.append(name)
+            namelens.append(len(name))
+        sent, failed, remaining = self._sendmmsg_all(sock, message, destinations,
+                                                     [ctypes.addressof(name) for name in names], namelens)
+        if not remaining:
+            return sent, failed + len(invalid), 0
+        # resume at the first unsent destination; invalid addresses after it fail again then
+        resume = indices[len(indices) - remaining]
+        return sent, failed + sum(1 for i in invalid if i < resume), len(batch) - resume
+
+    def _send_packed_mmsg(self, sock: Socket, message: ByteString, packed: PackedAddresses,
+                          base: int, start: int, stop: int):
+        slots = packed.slots[start:stop]
+        namelens = packed.namelens
+        return self._sendmmsg_all(sock, message, packed.addresses[start:stop],
+                                  [base + slot * SOCKADDR_SIZE for slot in slots],
+                                  [namelens[slot] for slot in slots])
+
+    def _sendmmsg_all(self, sock: Socket, message: ByteString, destinations: List[tuple],
+                      names: List[int], namelens: List[int]):
+        """ Sends the message to each destination using `sendmmsg`.
+
+        Args:
+            sock (Socket): the UDP socket on which to send the message
+            message (ByteString): the message to send
+            destinations (List[tuple]): the destination addresses (for error reporting)
+            names (List[int]): the memory address of the C socket address of each destination;
+                the caller keeps the underlying buffers alive
+            namelens (List[int]): the length of each C socket address
+
+        Returns:
+            the number of datagrams sent and failed, and the number of destinations at the
+            end that weren't attempted because the send buffer was full
+        """
+        count = len(destinations)
+        buffer = ctypes.create_string_buffer(bytes(message), len(message))
+        iov = _IOVec(ctypes.cast(buffer, ctypes.c_void_p), len(message))
+        iov_pointer = ctypes.pointer(iov)
+        headers = (_MMsgHdr * count)()
+        for header, name, namelen in zip(headers, names, namelens):
+            msg_hdr = header.msg_hdr
+            msg_hdr.msg_name = name
+            msg_hdr.msg_namelen = namelen
+            msg_hdr.msg_iov = iov_pointer
+            msg_hdr.msg_iovlen = 1
+
+        sent = failed = 0
+        offset = 0
+        fd = sock.fileno()
+        size = ctypes.sizeof(_MMsgHdr)
+        base = ctypes.addressof(headers)
+        while offset < count:
+            result = self._sendmmsg(fd, ctypes.cast(base + offset * size, ctypes.POINTER(_MMsgHdr)),
+                                    count - offset, 0)
+            if result < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err in _WOULD_BLOCK:
+                    return sent, failed, count - offset
+                # the datagram at the head of the batch could not be sent; skip it
+                logger.error(f"error sending message to subscriber {destinations[offset]}: {os.strerror(err)}")
+                failed += 1
+                offset += 1
+            else:
+                sent += result
+                offset += result
+        return sent, failed, 0
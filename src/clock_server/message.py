@@ -1,109 +1,136 @@
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 
-import struct
+from clock_protocol.tlv import (BASE_YEAR, LENGTH_DATE, LENGTH_HELLO, LENGTH_MICROSECOND, LENGTH_TIME,
+                                MICROSECONDS_PER_CENTI, TAG_DATE, TAG_HELLO, TAG_MICROSECOND, TAG_TIME,
+                                header)
+
+HEADER_HELLO = header(TAG_HELLO, LENGTH_HELLO)
+HEADER_DATE = header(TAG_DATE, LENGTH_DATE)
+HEADER_TIME = header(TAG_TIME, LENGTH_TIME)
+HEADER_MICROSECOND = header(TAG_MICROSECOND, LENGTH_MICROSECOND)
+
+# Number of distinct HELLO intervals, days and time ticks whose encodings are kept
+HELLO_CACHE_SIZE = 8
+DATE_CACHE_SIZE = 2
+TICK_CACHE_SIZE = 4
+
+
+def _bcd(value: int) -> int:
+    """ Encodes a value in the range [0..99] as a packed BCD octet """
+    return (value // 10) << 4 | value % 10
+
+
+def _centiseconds(microsecond: int) -> int:
+    """ Converts a microsecond count [0..999999] to hundredths of a second [0..99] """
+    return microsecond // MICROSECONDS_PER_CENTI
+
+
+@lru_cache(maxsize=HELLO_CACHE_SIZE)
+def encode_hello(dead_interval: int) -> bytes:
+    """ Encodes a complete HELLO field.
+
+    Args:
+        dead_interval (int): dead interval in seconds [0..65535]
+
+    Returns:
+        bytes: the encoded field (header and value)
+    """
+    return bytes((HEADER_HELLO,)) + int(dead_interval).to_bytes(2, "big")
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def encode_date(year: int, month: int, day: int) -> bytes:
+    """ Encodes a complete DATE field. The encoding changes once per day, so the
+        result is cached and shared by every caller on the same day.
+
+    Args:
+        year (int): year [2000..2199]
+        month (int): month [1..12]
+        day (int): day of the month [1..31]
+
+    Returns:
+        bytes: the encoded field (header and value)
+    """
+    century = (year - BASE_YEAR) // 100
+    week_day = date(year, month, day).weekday()
+    return bytes((HEADER_DATE, century << 3 | week_day, _bcd(year % 100), _bcd(month), _bcd(day)))
+
+
+@lru_cache(maxsize=TICK_CACHE_SIZE)
+def encode_time(hour: int, minute: int, second: int, centi: int) -> bytes:
+    """ Encodes a complete TIME field.
+
+    Args:
+        hour (int): hour [0..23]
+        minute (int): minute [0..59]
+        second (int): second [0..59]
+        centi (int): hundredths of a second [0..99]
+
+    Returns:
+        bytes: the encoded field (header and value)
+    """
+    return bytes((HEADER_TIME, _bcd(hour), _bcd(minute), _bcd(second), _bcd(centi)))
+
+
+def encode_microsecond(microsecond: int) -> bytes:
+    """ Encodes a complete MICROSECOND field. Clients that don't recognize it skip it
+        and use the TIME field's hundredths of a second.
+
+    Args:
+        microsecond (int): microsecond within the second [0..999999]
+
+    Returns:
+        bytes: the encoded field (header and value)
+    """
+    return bytes((HEADER_MICROSECOND, microsecond >> 16, (microsecond >> 8) & 0xFF, microsecond & 0xFF))
+
+
+@lru_cache(maxsize=TICK_CACHE_SIZE)
+def _encode_tick(year: int, month: int, day: int, hour: int, minute: int, second: int, centi: int) -> bytes:
+    return encode_date(year, month, day) + encode_time(hour, minute, second, centi)
+
+
+def encode_datetime(dt: datetime) -> bytes:
+    """ Encodes the DATE, TIME and MICROSECOND fields for the given date and time. The
+        DATE and TIME fields are encoded once per centisecond tick and shared by every
+        caller within the tick.
+
+    Args:
+        dt (datetime): the date and time to encode
+
+    Returns:
+        bytes: the encoded DATE, TIME and MICROSECOND fields
+    """
+    return (_encode_tick(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, _centiseconds(dt.microsecond))
+            + encode_microsecond(dt.microsecond))
 
-BASE_YEAR = 2000
 
 class MessageBuilder:
 
     def __init__(self):
         self._message = bytearray()
-    
+
     def to_bytes(self) -> bytes:
         """ Gets the encoded message as a byte array """
         return bytes(self._message)
 
     def append_hello(self, dead_interval: int):
         """ Encodes a HELLO field in the message """
-        print("Appending Hello")
-        self._message.extend((b'\x02'))
-        interval2 = (dead_interval % 256)
-        interval1 = (int(dead_interval / 256))
-        print(f"interval1: {interval1}")
-        print(f"interval2: {interval2}")
-        self._message.extend(struct.pack('>B', (interval1)))
-        self._message.extend(struct.pack('>B', (interval2)))
-        #self._message.extend(struct.pack('>B', int(interval1)))
-        #self._message.extend(struct.pack('>B', int(interval2)))
-        #self._message.extend(hex(dead_interval))
-        print(f"Appended Hello: {self._message}")
-
-    def _crunch(self, string: str):
-        b = bytes.fromhex(string)
-        self._message.append(b)
-
-
-    def append_date(self, dt: datetime):
-        """ Encodes a DATE field in the message """
-        print("Appending Date")
-        self._message.extend(bytes(b'\x14'))
+        self._message += encode_hello(dead_interval)
 
-        century = (int((dt.year - BASE_YEAR) / 100)) * 8
-        year = dt.year % 100
-        print(f"Year: {year}")
-        month = dt.month
-        #month = '{:0^{width}}'.format(dt.month, width=2)
-        day_month = '{:0^{width}}'.format(dt.day, width=2)
-        week_day = dt.weekday()
-
-
-        pack1 = int(f"{century}{week_day}")
-        pack1 = hex(pack1)[2:]
-        print(f"pack 1 : {pack1}")
-        #self._message.extend(bytes(pack1, 'utf-8'))
-        self._message.extend(struct.pack('>B', int(pack1, 16)))
-
-        year_hex = int((int(year / 10) * 16) + (year % 10))
-        pack2 = hex(year_hex)[2:]
-        print(f"pack 2 : {pack2}")
-        self._message.extend(struct.pack('>B', int(pack2, 16)))
-
-        print(month)
-        pack3 = hex(int(month))[2:]
-        print(f"pack 3 : {pack3}")
-        self._message.extend(struct.pack('>B', int(pack3, 16)))
-
-        pack4 = hex(int(day_month))[2:]
-        print(f"pack 4 : {pack4}")
-        self._message.extend(struct.pack('>B', int(pack4, 16)))
-
-        print(f"appended date: {self._message}")
+    def append_date(self, dt: date):
+        """ Encodes a DATE field in the message """
+        self._message += encode_date(dt.year, dt.month, dt.day)
 
     def append_time(self, dt: datetime):
         """ Encodes a TIME field in the message """
-        self._message.extend(bytes(b'\x24'))
-        hour = dt.hour
-        minute = dt.minute
-        second = dt.second
-        centi = dt.microsecond % 100
-        #hour = '{:0^{width}}'.format(dt.hour, width=2)
-        #minute = '{:0^{width}}'.format(dt.minute, width=2)
-        #second = '{:0^{width}}'.format(dt.second, width=2)
-        #centi = '{:0^{width}}'.format(str(dt.microsecond)[:2], width=2)
-        #mid = int(dt.microsecond / 10000) % 255
-        #print(f"centi : {dt.microsecond}")
-        #print(f"mid: {mid}")
-        #hexes = "" + hour + " " + minute + " " + second + " " + centi
-
-        hour_hex = int((int(hour / 10) * 16) + (hour % 10))
-        pack1 = hex(hour_hex)[2:]
-        print(f"pack 1 : {pack1}")
-        #self._message.extend(bytes(pack1, 'utf-8'))
-        self._message.extend(struct.pack('>b', int(pack1, 16)))
-
-        minute_hex = int((int(minute / 10) * 16) + (minute % 10))
-        pack2 = hex(minute_hex)[2:]
-        print(f"pack 2 : {pack2}")
-        self._message.extend(struct.pack('>B', int(pack2, 16)))
-
-        second_hex = int((int(second / 10) * 16) + (second % 10))
-        pack3 = hex(second_hex)[2:]
-        print(f"pack 3 : {pack3}")
-        self._message.extend(struct.pack('>B', int(pack3, 16)))
-
-        centi_hex = int((int(centi / 10) * 16) + (centi % 10))
-        pack4 = hex(centi_hex)[2:]
-        print(f"pack 4 : {pack4}")
-        self._message.extend(struct.pack('>B', int(pack4, 16)))
-
-        print(f"appended time: {self._message}")
\ No newline at end of file
+        self._message += encode_time(dt.hour, dt.minute, dt.second, _centiseconds(dt.microsecond))
+
+    def append_microsecond(self, dt: datetime):
+        """ Encodes a MICROSECOND field in the message """
+        self._message += encode_microsecond(dt.microsecond)
+
+    def append_datetime(self, dt: datetime):
+        """ Encodes DATE, TIME and MICROSECOND fields in the message """
+        self._message += encode_datetime(dt)
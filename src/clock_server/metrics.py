@@ -0,0 +1,224 @@
+import bisect
+import functools
+import logging
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Callable, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+METRICS_IP = "127.0.0.1"
+PREFIX = "netclock_"
+
+# One call in every DEFAULT_SAMPLE_RATE calls of an instrumented method is timed
+DEFAULT_SAMPLE_RATE = 16
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    """ A monotonically increasing count.
+        Each metric is updated by a single thread (the thread that runs the instrumented
+        method), so increments need no lock.
+    """
+
+    __slots__ = ("name", "help", "value")
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+
+class Gauge:
+    """ A value that is read from a function when the metrics are collected """
+
+    __slots__ = ("name", "help", "function")
+
+    def __init__(self, name: str, help: str, function: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.function = function
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.function()}"]
+
+
+class Histogram:
+    """ A distribution of observed values in fixed buckets """
+
+    __slots__ = ("name", "help", "buckets", "counts", "sum", "count")
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)     # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Registry:
+    """ A collection of metrics, rendered in the Prometheus text exposition format """
+
+    def __init__(self, sample_rate: int = DEFAULT_SAMPLE_RATE):
+        """ Initializes an empty registry.
+
+        Args:
+            sample_rate (int, optional): instrumented methods are timed once in every
+                `sample_rate` calls. Defaults to DEFAULT_SAMPLE_RATE.
+        """
+        self.sample_rate = max(1, sample_rate)
+        self._metrics = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        counter = Counter(PREFIX + name, help)
+        self._metrics.append(counter)
+        return counter
+
+    def gauge(self, name: str, help: str, function: Callable[[], float]) -> Gauge:
+        gauge = Gauge(PREFIX + name, help, function)
+        self._metrics.append(gauge)
+        return gauge
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        histogram = Histogram(PREFIX + name, help, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def instrument(self, obj, method: str, name: str, description: str):
+        """ Replaces a method of an object with a wrapper that counts every call and times
+            a sample of the calls. Timing only a sample keeps the cost of instrumentation
+            on the hot paths to an integer increment and a modulo for most calls.
+
+        Args:
+            obj: the object whose method is instrumented
+            method (str): the name of the method
+            name (str): the base name of the metrics
+            description (str): a description of the method, for the metrics' help text
+        """
+        calls = self.counter(f"{name}_total", f"Number of calls to {description}")
+        durations = self.histogram(f"{name}_seconds",
+                                   f"Duration of {description}, sampled one in {self.sample_rate} calls")
+        function = getattr(obj, method)
+        sample_rate = self.sample_rate
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            calls.value += 1
+            if calls.value % sample_rate:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                durations.observe(time.perf_counter() - start)
+
+        setattr(obj, method, wrapper)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as err:
+                logger.warning(f"failed to collect {metric.name}: {err}")
+        return "\n".join(lines) + "\n"
+
+
+def instrument_server(registry: Registry, server):
+    """ Instruments the hot paths of a clock server and exposes its subscriber count
+        and the outcome of its last broadcast. (The asyncio engine doesn't call refresh;
+        its aging is covered by expire and its broadcasts by the last-broadcast gauges.)
+    """
+    registry.instrument(server, "refresh", "refresh", "the periodic refresh (aging and broadcast)")
+    registry.instrument(server, "expire", "expire", "subscriber aging")
+    registry.instrument(server, "handle_input", "handle_input", "the handler for each received datagram")
+    registry.instrument(server, "update", "update", "the subscriber update for each HELLO")
+    registry.gauge("subscribers", "Number of subscribers", lambda: server.subscriber_count)
+    registry.gauge("last_broadcast_sent", "Datagrams sent by the last broadcast",
+                   lambda: server.last_broadcast.sent if server.last_broadcast else 0)
+    registry.gauge("last_broadcast_failed", "Datagrams that could not be sent by the last broadcast",
+                   lambda: server.last_broadcast.failed if server.last_broadcast else 0)
+    registry.gauge("last_broadcast_seconds", "Duration of the last broadcast",
+                   lambda: server.last_broadcast.duration if server.last_broadcast else 0.0)
+
+
+def instrument_repository(registry: Registry, repository):
+    """ Instruments the saves of a subscriber repository and exposes its queue depth """
+    registry.instrument(repository, "_save", "repository_save", "the repository save")
+    registry.gauge("repository_queue_depth", "Number of requests waiting in the repository queue",
+                   lambda: repository.queue_depth)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"metrics request from {self.client_address}: {format % args}")
+
+
+class MetricsServer:
+    """ Serves the metrics of a registry over HTTP (at /metrics) from a daemon thread """
+
+    def __init__(self, registry: Registry, local_ip: str = METRICS_IP, local_port: int = 0):
+        """ Initializes a metrics server.
+
+        Args:
+            registry (Registry): the metrics to serve
+            local_ip (str, optional): local IP address to listen on; loopback by default
+            local_port (int, optional): local TCP port to listen on
+        """
+        self.registry = registry
+        self.local_address = (local_ip, local_port)
+        self._httpd: ThreadingHTTPServer = None
+
+    def start(self):
+        """ Starts serving metrics """
+        self._httpd = ThreadingHTTPServer(self.local_address, _MetricsHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.registry = self.registry
+        Thread(target=self._httpd.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"serving metrics on http://{self.local_address[0]}:{self._httpd.server_address[1]}/metrics")
+
+    def stop(self):
+        """ Stops serving metrics """
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
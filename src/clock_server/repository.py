@@ -1,10 +1,9 @@
-import json
 import logging
-import os
-import shutil
+import time
 
-from typing import Iterable, Set
+from typing import Dict, Iterable, List, Set
 
+from .storage import ADD, DISCARD, JsonStorage
 from .subscriber import ClockSubscriber
 
 from threading import Thread, Event
@@ -12,70 +11,104 @@ from queue import Queue, Empty
 
 logger = logging.getLogger(__name__)
 
+# Minimum interval (in seconds) between successive saves of the subscriber file
+DEFAULT_FLUSH_INTERVAL = 1.0
+QUEUE_TIMEOUT = 0.250
+
 
 class SubscriberRepository:
     """ A persistent repository of subscribers """
 
-    def __init__(self, output_filename: str):
+    def __init__(self, output_filename: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL, storage=None):
         """ Initializes a repository instance.
 
         Args:
             output_filename (str): output file path
+            flush_interval (float, optional): minimum interval in seconds between saves;
+                changes made in the meantime are coalesced into a single save.
+                Defaults to DEFAULT_FLUSH_INTERVAL.
+            storage (optional): the storage backend (see the storage module); defaults
+                to a JsonStorage for the output file. Changes that only renew existing
+                subscribers are saved no more often than the storage's renewal_interval.
         """
         self.output_filename = output_filename
-        basename, suffix = os.path.splitext(output_filename)
-        self.backup_filename = f"{basename}_backup{suffix}"
+        self.storage = storage or JsonStorage(output_filename)
         self._thread = Thread(target=self._run)
         self._queue = Queue()
         self._shutdown = Event()
         self._subscribers = set()
+        self.flush_interval = flush_interval
+        self._changes: Dict[ClockSubscriber, str] = {}
+        # whether a subscriber was added or discarded (rather than only renewed) since the last flush
+        self._membership_changed = False
+        self._last_flush = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """ Gets the (approximate) number of requests waiting to be applied """
+        return self._queue.qsize()
+
+    @property
+    def renewal_interval(self) -> float:
+        """ Gets the minimum interval in seconds between saves that only record renewals """
+        return max(self.flush_interval, getattr(self.storage, "renewal_interval", 0.0))
+
+    def _flush_delay(self) -> float:
+        """ Gets the time in seconds until the pending changes are due to be saved """
+        interval = self.flush_interval if self._membership_changed else self.renewal_interval
+        return self._last_flush + interval - time.monotonic()
 
     def _run(self):
         while not self._shutdown.is_set():
+            timeout = QUEUE_TIMEOUT
+            if self._changes:
+                timeout = min(timeout, max(0.0, self._flush_delay()))
             try:
-                action, subscriber = self._queue.get(timeout=0.250)
+                action, subscriber = self._queue.get(timeout=timeout)
                 action(subscriber)
+                self._drain()
             except Empty:
                 pass
+            if self._changes and self._flush_delay() <= 0:
+                self._flush()
+
+        self._drain()
+        if self._changes:
+            self._flush()
+
+    def _drain(self):
+        """ Applies all of the requests that are currently waiting in the queue """
+        while True:
+            try:
+                action, subscriber = self._queue.get_nowait()
+            except Empty:
+                return
+            action(subscriber)
+
+    def _flush(self):
+        """ Saves the changes to the set of subscribers and clears the pending changes """
+        self._save(self._subscribers)
+        self._changes = {}
+        self._membership_changed = False
+        self._last_flush = time.monotonic()
 
     def _load(self) -> Set[ClockSubscriber]:
-        """ Loads a set of subscribers from a JSON file using the configured filename.
+        """ Loads a set of subscribers from the storage backend.
 
         Returns:
-            Set[ClockSubscriber]: set of subscribers; empty set if the file does not exist
-                or contains no subscribers
+            Set[ClockSubscriber]: set of subscribers; empty set if nothing has been stored
         """
-        addresses = None
-        if os.path.exists(self.output_filename):
-            try:
-                with open(self.output_filename, "r") as input_file:
-                    addresses = json.load(input_file)
-            except (OSError, json.JSONDecodeError) as err:
-                logger.warning(f"failed to load subscribers from {self.output_filename}: {err}")
-        
-        return {ClockSubscriber(tuple(address)) for address in addresses} if addresses else set()
+        return self.storage.load()
 
     def _save(self, subscribers: Iterable[ClockSubscriber]):
-        """ Saves a set of subscribers as a JSON file using the configured filename.
+        """ Saves a set of subscribers, together with the pending changes, using the storage backend.
 
         Args:
             subscribers (Iterable[ClockSubscriber]): an iterable of subscriber objects to be saved
         """
-        if os.path.exists(self.output_filename):
-            try:
-                shutil.copyfile(self.output_filename, self.backup_filename)
-                logger.debug(f"copied {self.output_filename} to {self.backup_filename}")
-            except OSError as err:
-                logger.warning(f"failed to copy {self.output_filename} to {self.backup_filename}: {err}")
-
-        try:
-            with open(self.output_filename, "w") as output_file:
-                json.dump(sorted([list(subscriber.address) for subscriber in subscribers]), output_file, indent=2)
-            logger.debug(f"stored subscribers in {self.output_filename}")
-            logger.info(f"saved subscribers")
-        except OSError as err:
-            logger.warning(f"failed to save subscribers to {self.output_filename}: {err}")                
-    
+        self.storage.save(subscribers, self._changes)
+        logger.info(f"saved subscribers")
+
     def start(self) -> Iterable[ClockSubscriber]:
         """ Loads the persistent record of subscribers (if any) and starts the thread
             that services the queue of requests to add/discard subscribers.
@@ -93,31 +126,48 @@ class SubscriberRepository:
     
     def stop(self):
         """ Stops the thread that services the queue of requests to add/discard subscribers
-            in preparation for server shutdown. 
+            in preparation for server shutdown. Any pending changes are saved before the
+            thread exits.
         """
         self._shutdown.set()
         self._thread.join()
+        self.storage.close()
         logger.debug("repository stopped")
 
     def _add(self, subscriber: ClockSubscriber):
         if subscriber not in self._subscribers:
-            self._subscribers.add(subscriber)
-            self._save(self._subscribers)
+            self._membership_changed = True
+        # replace any previous record, which has an older last-HELLO time
+        self._subscribers.discard(subscriber)
+        self._subscribers.add(subscriber)
+        self._changes.pop(subscriber, None)
+        self._changes[subscriber] = ADD
     
     def add(self, subscriber: ClockSubscriber):
-        """ Adds a subscriber to the persistent record of all subscribers.
+        """ Adds a subscriber to the persistent record of all subscribers, or records
+            the renewal of an existing subscriber (i.e. the time of its last HELLO).
             This method accepts the request to add the subscriber and returns immediately
             (without blocking); the subscriber will be saved asynchronously.
         Args:
             subscriber (ClockSubscriber): the subscriber to add
         """
-        self._queue.put((self._add, subscriber))
+        record = ClockSubscriber(subscriber.address)
+        record.last_hello = subscriber.last_hello
+        self._queue.put((self._add, record))
 
     def _discard(self, subscriber: ClockSubscriber):
         if subscriber in self._subscribers:
             self._subscribers.discard(subscriber)
-            self._save(self._subscribers)
+            self._changes[subscriber] = DISCARD
+            self._membership_changed = True
     
+    def released(self) -> List[tuple]:
+        """ Gets the addresses of subscribers that another server has taken over; always
+            empty, since this repository's server owns all of its subscribers (see
+            workers.ShardRepository)
+        """
+        return []
+
     def discard(self, subscriber: ClockSubscriber):
         """ Discards a subscriber from the persistent record of all subscribers.
             This method accepts the request to discards the subscriber and returns 
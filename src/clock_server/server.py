@@ -2,23 +2,30 @@ import logging
 import socket
 import threading
 import datetime
+import time
 
+from clock_protocol.log import Hex, SampledLogger
+from clock_protocol.tlv import Field, HelloField, read_fields
+
+from .expiry import ExpiryWheel
+from .fanout import BroadcastStats, FanoutEngine
 from .repository import SubscriberRepository
-from .message import MessageBuilder
+from .message import MessageBuilder, encode_datetime
 from .subscriber import ClockSubscriber
-from typing import ByteString
+from .table import PackedAddresses, SubscriberTable
+from typing import ByteString, Iterable
 
 logger = logging.getLogger(__name__)
+packet_logger = SampledLogger(logger)
 
 MAX_DATAGRAM_SIZE = 65536
 
-TAG_HELLO = 0
-TAG_DATE = 1
-TAG_TIME = 2
-
-LENGTH_HELLO = 2
-LENGTH_DATE = 4
-LENGTH_TIME = 4
+# A renewal is written to the repository only if the last-HELLO time stored there is older
+# than this fraction of the dead interval, rather than queueing a request for every HELLO;
+# the storage's renewal_interval further limits how often renewals cause a save. Clients
+# (which renew several times per dead interval) whose stored time is too stale, and are
+# dropped as expired after a restart, are added back by their next HELLO.
+PERSIST_RENEWAL_FRACTION = 0.5
 
 class ClockServer:
     """ The clock server.
@@ -27,7 +34,8 @@ class ClockServer:
     """
     
     def __init__(self, local_ip: str, local_port: int, dead_interval: float, refresh_interval: float,
-                 subscriber_repository: SubscriberRepository):
+                 subscriber_repository: SubscriberRepository, fanout: FanoutEngine = None,
+                 reuse_port: bool = False):
         """ Initializes a server instance.
 
         Args:
@@ -41,103 +49,193 @@ class ClockServer:
             subscriber_repository (ClockSubscriberRepository): a repository that
                 will be used to make client subscription's peristent across server
                 restarts
+            fanout (FanoutEngine, optional): the engine used to send broadcasts to
+                all subscribers; a default engine is created if not specified
+            reuse_port (bool, optional): bind with SO_REUSEPORT so that several server
+                processes can share the local port
         """
         self.dead_interval = dead_interval
         self.refresh_interval = refresh_interval
         self.local_address = (local_ip, local_port)
         self.subscriber_repository = subscriber_repository
+        self.reuse_port = reuse_port
         self._lock = threading.Lock()
         self._timer = threading.Timer(self.refresh_interval, self.refresh)
-        self._subscribers = set()
+        self._timer_lock = threading.Lock()
+        self._stopping = False
+        self._subscribers = SubscriberTable()
+        self._expiry = ExpiryWheel()
+        self._fanout = fanout or FanoutEngine()
+        self.last_broadcast: BroadcastStats = None
+
 
+    @property
+    def subscriber_count(self) -> int:
+        """ Gets the number of subscribers """
+        return len(self._subscribers)
 
     def refresh(self):
-        subs_new = set()
-        logger.info("refreshing")
-        with self._lock:
-            now = datetime.datetime.now()
-            subs = set(self._subscribers)
-            for sub in subs:
-                if sub.last_hello is not None and sub.last_hello + datetime.timedelta(seconds=self.dead_interval) < now:
-                    self._subscribers.discard(sub)
-                    self.subscriber_repository.discard(sub)
-                    subs_new = set(self._subscribers)
-        message = MessageBuilder()
-        message.append_date(now.date())
-        message.append_time(now.time())
-        message = message.to_bytes()
-        logger.info(f"Sending time: " + str(message))
-        for sub_new in subs_new:
-            sub_new.send(self.serv_sock, message)
-        if subs_new:
+        logger.debug("refreshing")
+        addresses = self.expire()
+        self.broadcast(encode_datetime(datetime.datetime.now()), addresses)
+        if addresses:
             self.schedule()
+
+    def expire(self) -> PackedAddresses:
+        """ Discards the subscribers that haven't sent a HELLO within the dead interval.
+            Only the subscribers whose deadlines have passed are visited. Subscribers
+            that another server has taken over (see the repository's `released`) are
+            removed without being discarded.
+
+        Returns:
+            PackedAddresses: a snapshot of the remaining subscribers
+        """
+        with self._lock:
+            for address in self.subscriber_repository.released():
+                slot = self._subscribers.slot(address)
+                if slot is not None:
+                    self._expiry.remove(slot)
+                    self._subscribers.remove(slot)
+            for slot in self._expiry.expire(time.monotonic()):
+                address = self._subscribers.remove(slot)
+                self.subscriber_repository.discard(ClockSubscriber(address))
+            return self._subscribers.snapshot()
+
+    def broadcast(self, message: bytes, addresses: PackedAddresses):
+        """ Sends a message to the given subscriber addresses using the fan-out engine
+            and reports how long the broadcast took.
+
+        Args:
+            message (bytes): the message to send
+            addresses (PackedAddresses): a snapshot of the subscriber table
+        """
+        self._report_broadcast(self._fanout.broadcast(self.serv_sock, message, addresses))
+
+    def _report_broadcast(self, stats: BroadcastStats):
+        self.last_broadcast = stats
+        logger.info(f"broadcast to {stats.sent} subscribers in {stats.duration * 1000:.3f} ms"
+                    + (f" ({stats.failed} failed)" if stats.failed else ""))
+        if stats.duration >= self.refresh_interval:
+            logger.warning(f"broadcast took {stats.duration:.3f} s, longer than the refresh interval "
+                           f"of {self.refresh_interval} s")
             
     def schedule(self):
-        if self._timer is not None:
+        with self._timer_lock:
+            if self._stopping:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.refresh_interval, self.refresh)
+            self._timer.start()
+
+    def _cancel_timer(self):
+        """ Cancels the refresh timer; a refresh that is already running won't reschedule it """
+        with self._timer_lock:
+            self._stopping = True
             self._timer.cancel()
-        self._timer = threading.Timer(self.refresh_interval, self.refresh)
-        self._timer.start()
 
 
     def initialize(self):
         builder = MessageBuilder()
         builder.append_hello(self.dead_interval)
-        now = datetime.datetime.now()
-        builder.append_date(now.date())
-        builder.append_time(now.time())
-        bytes = builder.to_bytes()
-        for sub in self._subscribers:
-            sub.send(self.serv_sock, bytes)
+        builder.append_datetime(datetime.datetime.now())
+        with self._lock:
+            addresses = self._subscribers.snapshot()
+        self.broadcast(builder.to_bytes(), addresses)
         if self._subscribers:
             self.schedule()
 
     def update(self, address: tuple):
-        new_sub = ClockSubscriber(address)
-        subToBe = False
+        """ Records a HELLO from the given address, adding a new subscriber or renewing
+            an existing subscription. New subscribers are written to the repository at once;
+            renewals only when the stored last-HELLO time is older than
+            PERSIST_RENEWAL_FRACTION of the dead interval.
+
+        Args:
+            address (tuple): the subscriber's address
+
+        Returns:
+            a 2-tuple consisting of a flag that is True if the subscriber was added and
+            the subscriber object
+        """
+        now = time.monotonic()
         with self._lock:
-            if new_sub not in self._subscribers:
-                subToBe = True
-                self._subscribers.add(new_sub)
-                self.subscriber_repository.add(new_sub)
-                new_sub.last_hello = datetime.datetime.now()
-        return subToBe, new_sub
+            slot, added = self._subscribers.add(address, now)
+            sub = self._subscribers.view(slot)
+            if added or now - self._subscribers.persisted(slot) >= self.dead_interval * PERSIST_RENEWAL_FRACTION:
+                self._subscribers.set_persisted(slot, now)
+                self.subscriber_repository.add(sub)
+            self._expiry.schedule(slot, now + self.dead_interval)
+        return added, sub
+
+    def restore(self, subscribers: Iterable[ClockSubscriber]):
+        """ Adds the subscribers loaded from the repository to the subscriber table and
+            schedules their expiry, dead interval after their last HELLO. Subscribers that
+            have already expired are discarded from the repository instead; subscribers
+            whose last HELLO is unknown are given a whole dead interval from now.
+
+        Args:
+            subscribers (Iterable[ClockSubscriber]): the stored subscribers
+        """
+        now = time.monotonic()
+        wall_now = datetime.datetime.now()
+        restored = 0
+        expired = []
+        with self._lock:
+            for sub in subscribers:
+                last_hello = None
+                if sub.last_hello is not None:
+                    last_hello = now - (wall_now - sub.last_hello).total_seconds()
+                deadline = (now if last_hello is None else last_hello) + self.dead_interval
+                if deadline <= now:
+                    expired.append(sub)
+                    continue
+                try:
+                    slot, _ = self._subscribers.add(sub.address, last_hello)
+                except (OSError, ValueError, TypeError) as err:
+                    logger.warning(f"ignoring stored subscriber {sub}: {err}")
+                    continue
+                self._expiry.schedule(slot, deadline)
+                restored += 1
+        for sub in expired:
+            self.subscriber_repository.discard(sub)
+        logger.info(f"restored {restored} subscribers; discarded {len(expired)} expired subscribers")
 
-    
-    def tlv_reader(self, message: ByteString):
-        i = 0
-        while i + 1 <= len(message):
-            tag = message[i] << 4
-            length = message[i] & 0xf
-            if i + 1 + length > len(message):
-                raise ValueError(f"tag {tag} length {length} has short value {value}")
-            value = message[i + 1:i + 1 + length]
-            yield tag, value
-            #yield int.from_bytes(tag, 'big'), value
-            i += 1 + len(value)
-
-    def handle_field(self, tag: int, value: bytes, address: tuple):
-        print(f"Handling field with tag {tag} and value {value}")
-        try:
-            if tag != TAG_HELLO:
-                raise ValueError(f"Recieved tag from client other than HELLO: {tag}")
-            added, sub = self.update(address)
-            builder = MessageBuilder()
-            builder.append_hello(self.dead_interval)
-            if added:
-                now = datetime.datetime.now()
-                builder.append_date(now.date())
-                builder.append_time(now.time())
-            message = builder.to_bytes()
-            logger.info(f"message: {message}")
-            sub.send(self.serv_sock, builder.to_bytes())
-            if added:
-                self.schedule()
-        except ValueError:
-            logger.error(ValueError) 
+
+    def handle_field(self, field: Field, address: tuple):
+        if not isinstance(field, HelloField):
+            logger.error(f"received field from client {address} other than HELLO: {field}")
+            return
+        added, sub = self.update(address)
+        builder = MessageBuilder()
+        builder.append_hello(self.dead_interval)
+        if added:
+            builder.append_datetime(datetime.datetime.now())
+        message = builder.to_bytes()
+        packet_logger.debug("replying to %s: %s", address, Hex(message))
+        sub.send(self.serv_sock, message)
+        if added:
+            self.schedule()
 
     def handle_input(self, data: ByteString, address):
-        for tag, value in self.tlv_reader(data):
-            self.handle_field(tag, value, address)
+        packet_logger.debug("received %s from %s", Hex(data), address)
+        try:
+            for field in read_fields(data):
+                self.handle_field(field, address)
+        except ValueError as err:
+            logger.error(f"invalid message from client {address}: {err}")
+
+    def _open_socket(self) -> socket.socket:
+        """ Opens the server's UDP socket and binds it to the configured local address.
+
+        Returns:
+            The new socket object.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(self.local_address)
+        return sock
 
     def run(self):
         """ Run the server.
@@ -146,25 +244,18 @@ class ClockServer:
             periodically send date and time broadcasts and age the set of subscribers.
         """
         
-        self.serv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        #self.serv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.serv_sock.bind(self.local_address)
-        # self.serv_sock.listen()
-        #self.serv_sock.setblocking(False)
-
-        self._subscribers = self.subscriber_repository.start()
+        self.serv_sock = self._open_socket()
+        self.restore(self.subscriber_repository.start())
         self.initialize()
-        print(f"Address is: {self.local_address}")
+        logger.info(f"listening on {self.local_address}")
         try:
             while True:
-                print("waiting")
                 data, addr = self.serv_sock.recvfrom(MAX_DATAGRAM_SIZE)
-                print("received " + str(data))
                 self.handle_input(data, addr)
         except KeyboardInterrupt:
             pass
         
-        self._timer.cancel()
+        self._cancel_timer()
         self.subscriber_repository.stop()
 
 
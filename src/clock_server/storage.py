@@ -0,0 +1,407 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+
+from datetime import datetime, timedelta
+from threading import Thread
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from .subscriber import ClockSubscriber
+
+logger = logging.getLogger(__name__)
+
+# Size (in bytes) beyond which the journal is compacted into a new snapshot
+DEFAULT_COMPACT_THRESHOLD = 1 << 20
+# Minimum interval (in seconds) between JSON saves that only record renewals, if the
+# dead interval isn't known (the server's default dead interval)
+DEFAULT_RENEWAL_INTERVAL = 120.0
+
+ADD = "add"
+DISCARD = "discard"
+# Journal record of the dead interval announced to the subscribers recorded after it
+INTERVAL = "interval"
+
+
+def _backup_filename(filename: str) -> str:
+    basename, suffix = os.path.splitext(filename)
+    return f"{basename}_backup{suffix}"
+
+
+def _backup(filename: str, backup_filename: str):
+    """ Copies a file to its backup, if the file exists """
+    if os.path.exists(filename):
+        try:
+            shutil.copyfile(filename, backup_filename)
+            logger.debug(f"copied {filename} to {backup_filename}")
+        except OSError as err:
+            logger.warning(f"failed to copy {filename} to {backup_filename}: {err}")
+
+
+def _timestamp(last_hello: Optional[datetime]) -> Optional[float]:
+    return last_hello.timestamp() if last_hello else None
+
+
+def _subscriber(address: list, timestamp: Optional[float] = None) -> ClockSubscriber:
+    """ Produces a detached subscriber from its stored address and last-HELLO timestamp """
+    subscriber = ClockSubscriber(tuple(address))
+    if timestamp is not None:
+        subscriber.last_hello = datetime.fromtimestamp(timestamp)
+    return subscriber
+
+
+def _live(subscribers: Iterable[ClockSubscriber], dead_interval: Optional[float]) -> Set[ClockSubscriber]:
+    """ Filters out the subscribers whose last HELLO is older than the dead interval.
+        Subscribers whose last HELLO is unknown are kept.
+    """
+    if dead_interval is None:
+        return set(subscribers)
+    cutoff = datetime.now() - timedelta(seconds=dead_interval)
+    return {subscriber for subscriber in subscribers
+            if subscriber.last_hello is None or subscriber.last_hello >= cutoff}
+
+
+def _read_snapshot(filename: str) -> Tuple[Set[ClockSubscriber], Optional[float]]:
+    """ Reads a set of subscribers from a JSON file.
+
+    Returns:
+        Tuple[Set[ClockSubscriber], Optional[float]]: the subscribers (empty set if the file
+            does not exist) and the stored dead interval (None if unknown)
+    """
+    content = None
+    if os.path.exists(filename):
+        try:
+            with open(filename, "r") as input_file:
+                content = json.load(input_file)
+        except (OSError, json.JSONDecodeError) as err:
+            logger.warning(f"failed to load subscribers from {filename}: {err}")
+
+    if not content:
+        return set(), None
+    if isinstance(content, list):
+        # the original format; a list of addresses
+        return {_subscriber(address) for address in content}, None
+    return {_subscriber(*record) for record in content["subscribers"]}, content.get("dead_interval")
+
+
+def _write_snapshot(filename: str, subscribers: Iterable[ClockSubscriber], dead_interval: Optional[float]):
+    """ Writes a set of subscribers, with their last-HELLO timestamps, to a JSON file """
+    records = sorted(([list(subscriber.address), _timestamp(subscriber.last_hello)] for subscriber in subscribers),
+                     key=lambda record: record[0])
+    with open(filename, "w") as output_file:
+        json.dump({"dead_interval": dead_interval, "subscribers": records}, output_file, indent=2)
+
+
+class JsonStorage:
+    """ Stores the set of subscribers as a JSON file that is rewritten on each save.
+        The previous file is copied to a backup file before it is overwritten.
+
+        Since every save rewrites the whole file, renewals (new last-HELLO times of
+        existing subscribers) don't cause a save of their own more than once per renewal
+        interval, the dead interval: they are written with the next added or discarded
+        subscriber, or after the renewal interval. With a steady set of subscribers, the
+        file is rewritten once per dead interval rather than once per flush interval.
+    """
+
+    def __init__(self, filename: str, dead_interval: float = None):
+        """ Initializes the storage.
+
+        Args:
+            filename (str): path of the JSON file
+            dead_interval (float, optional): the dead interval announced to the subscribers,
+                which is stored with them
+        """
+        self.filename = filename
+        self.backup_filename = _backup_filename(filename)
+        self.dead_interval = dead_interval
+        self.renewal_interval = DEFAULT_RENEWAL_INTERVAL if dead_interval is None else dead_interval
+
+    def load(self) -> Set[ClockSubscriber]:
+        """ Loads the stored subscribers that are still live, according to the stored
+            dead interval (or the current one, if none was stored).
+
+        Returns:
+            Set[ClockSubscriber]: set of subscribers; empty set if the file does not exist
+                or contains no subscribers
+        """
+        subscribers, dead_interval = _read_snapshot(self.filename)
+        return _live(subscribers, self.dead_interval if dead_interval is None else dead_interval)
+
+    def save(self, subscribers: Set[ClockSubscriber], changes: Dict[ClockSubscriber, str]):
+        """ Saves the set of subscribers.
+
+        Args:
+            subscribers (Set[ClockSubscriber]): all current subscribers
+            changes (Dict[ClockSubscriber, str]): the subscribers added (ADD) or
+                discarded (DISCARD) since the previous save
+        """
+        _backup(self.filename, self.backup_filename)
+        try:
+            _write_snapshot(self.filename, subscribers, self.dead_interval)
+            logger.debug(f"stored subscribers in {self.filename}")
+        except OSError as err:
+            logger.warning(f"failed to save subscribers to {self.filename}: {err}")
+
+    def close(self):
+        """ Releases any resources held by the storage """
+
+
+class JournalStorage:
+    """ Stores subscribers as a snapshot plus an append-only journal of changes.
+
+        Each save appends one record per added or discarded subscriber to the journal,
+        so the cost of a save doesn't depend on the number of subscribers. When the
+        journal grows beyond a threshold, it is rotated and a background thread writes
+        a new snapshot and removes the rotated journal. Loading replays the snapshot,
+        then the rotated journal (if a compaction was interrupted), then the journal.
+        The snapshot uses the same format as JsonStorage.
+    """
+
+    # renewals are appended at every flush, like any other change
+    renewal_interval = 0.0
+
+    def __init__(self, filename: str, dead_interval: float = None,
+                 compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        """ Initializes the storage.
+
+        Args:
+            filename (str): path of the snapshot file; the journal is kept next to it
+            dead_interval (float, optional): the dead interval announced to the subscribers,
+                which is stored with them
+            compact_threshold (int, optional): journal size in bytes that triggers a compaction.
+                Defaults to DEFAULT_COMPACT_THRESHOLD.
+        """
+        self.filename = filename
+        self.dead_interval = dead_interval
+        self.backup_filename = _backup_filename(filename)
+        basename, _ = os.path.splitext(filename)
+        self.journal_filename = f"{basename}.journal"
+        self.rotated_filename = f"{basename}.journal.old"
+        self.compact_threshold = compact_threshold
+        self._journal = None
+        self._compactor: Thread = None
+
+    def _replay(self, filename: str, subscribers: Set[ClockSubscriber],
+                dead_interval: Optional[float]) -> Optional[float]:
+        """ Applies the records of a journal file to a set of subscribers.
+
+        Returns:
+            Optional[float]: the dead interval after the last interval record, or the
+                given dead interval if there is none
+        """
+        if not os.path.exists(filename):
+            return dead_interval
+        try:
+            with open(filename, "r") as input_file:
+                for number, line in enumerate(input_file, 1):
+                    try:
+                        action, *values = json.loads(line)
+                        if action == INTERVAL:
+                            dead_interval = values[0]
+                            continue
+                        subscriber = _subscriber(*values)
+                    except (json.JSONDecodeError, ValueError, TypeError, IndexError):
+                        # most likely a record torn by a crash while it was being appended
+                        logger.warning(f"ignoring invalid record at {filename}:{number}")
+                        continue
+                    subscribers.discard(subscriber)
+                    if action == ADD:
+                        subscribers.add(subscriber)
+        except OSError as err:
+            logger.warning(f"failed to replay {filename}: {err}")
+        return dead_interval
+
+    def load(self) -> Set[ClockSubscriber]:
+        """ Loads the stored subscribers by replaying the snapshot and the journal, and
+            keeps those that are still live according to the most recently stored dead
+            interval (or the current one, if none was stored).
+
+        Returns:
+            Set[ClockSubscriber]: set of subscribers; empty set if nothing has been stored
+        """
+        subscribers, dead_interval = _read_snapshot(self.filename)
+        dead_interval = self._replay(self.rotated_filename, subscribers, dead_interval)
+        dead_interval = self._replay(self.journal_filename, subscribers, dead_interval)
+        return _live(subscribers, self.dead_interval if dead_interval is None else dead_interval)
+
+    def _record(self, subscriber: ClockSubscriber, action: str) -> str:
+        if action == ADD:
+            return json.dumps([ADD, list(subscriber.address), _timestamp(subscriber.last_hello)]) + "\n"
+        return json.dumps([action, list(subscriber.address)]) + "\n"
+
+    def save(self, subscribers: Set[ClockSubscriber], changes: Dict[ClockSubscriber, str]):
+        """ Appends the changes since the previous save to the journal.
+
+        Args:
+            subscribers (Set[ClockSubscriber]): all current subscribers
+            changes (Dict[ClockSubscriber, str]): the subscribers added (ADD) or
+                discarded (DISCARD) since the previous save
+        """
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_filename, "a")
+                self._journal.write(json.dumps([INTERVAL, self.dead_interval]) + "\n")
+            self._journal.write("".join(self._record(subscriber, action) for subscriber, action in changes.items()))
+            self._journal.flush()
+            logger.debug(f"appended {len(changes)} records to {self.journal_filename}")
+        except OSError as err:
+            logger.warning(f"failed to append to {self.journal_filename}: {err}")
+            return
+
+        if self._journal.tell() >= self.compact_threshold and not self._compacting():
+            self._start_compaction(set(subscribers))
+
+    def _compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def _start_compaction(self, subscribers: Set[ClockSubscriber]):
+        self._journal.close()
+        self._journal = None
+        try:
+            if os.path.exists(self.rotated_filename):
+                # a previous compaction failed; the rotated journal is still needed until
+                # a snapshot succeeds, so the current journal is folded into it
+                with open(self.rotated_filename, "a") as rotated, open(self.journal_filename, "r") as journal:
+                    shutil.copyfileobj(journal, rotated)
+                os.remove(self.journal_filename)
+            else:
+                os.replace(self.journal_filename, self.rotated_filename)
+        except OSError as err:
+            logger.warning(f"failed to rotate {self.journal_filename}: {err}")
+            return
+        self._compactor = Thread(target=self._compact, args=(subscribers,), name="compactor")
+        self._compactor.start()
+
+    def _compact(self, subscribers: Set[ClockSubscriber]):
+        """ Writes a new snapshot and removes the rotated journal that it supersedes """
+        temp_filename = f"{self.filename}.tmp"
+        try:
+            _write_snapshot(temp_filename, subscribers, self.dead_interval)
+            _backup(self.filename, self.backup_filename)
+            os.replace(temp_filename, self.filename)
+            os.remove(self.rotated_filename)
+            logger.info(f"compacted {len(subscribers)} subscribers into {self.filename}")
+        except OSError as err:
+            logger.warning(f"failed to compact {self.journal_filename}: {err}")
+
+    def close(self):
+        """ Waits for a compaction in progress and closes the journal """
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class SqliteStorage:
+    """ Stores subscribers in an SQLite database, for very large subscriber populations.
+
+        The database runs in WAL mode, so saving doesn't block readers and commits
+        are cheap. Each save applies all of the changes since the previous save in
+        a single transaction, looking subscribers up through the primary key index
+        on the address. The time of each subscriber's last HELLO is stored as well,
+        so that loading skips the subscribers that are no longer live.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS subscribers (
+            address TEXT PRIMARY KEY NOT NULL,
+            last_hello REAL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS subscribers_last_hello ON subscribers (last_hello);
+        CREATE TABLE IF NOT EXISTS settings (
+            name TEXT PRIMARY KEY NOT NULL,
+            value
+        ) WITHOUT ROWID;
+    """
+
+    # renewals are updated at every flush, like any other change
+    renewal_interval = 0.0
+
+    def __init__(self, filename: str, dead_interval: float = None):
+        """ Initializes the storage.
+
+        Args:
+            filename (str): path of the database file
+            dead_interval (float, optional): the dead interval announced to the subscribers,
+                which is stored with them
+        """
+        self.filename = filename
+        self.dead_interval = dead_interval
+        self._connection: sqlite3.Connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # loaded by the main thread, saved by the repository thread; never concurrently
+            self._connection = sqlite3.connect(self.filename, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(self.SCHEMA)
+        return self._connection
+
+    def load(self) -> Set[ClockSubscriber]:
+        """ Loads the stored subscribers that are still live, according to the stored
+            dead interval (or the current one, if none was stored). The subscribers that
+            have expired are deleted in a single statement.
+
+        Returns:
+            Set[ClockSubscriber]: set of subscribers; empty set if nothing has been stored
+        """
+        subscribers = set()
+        try:
+            connection = self._connect()
+            row = connection.execute("SELECT value FROM settings WHERE name = 'dead_interval'").fetchone()
+            dead_interval = self.dead_interval if row is None or row[0] is None else row[0]
+            if dead_interval is not None:
+                with connection:
+                    expired = connection.execute("DELETE FROM subscribers WHERE last_hello < ?",
+                                                 (time.time() - dead_interval,)).rowcount
+                if expired:
+                    logger.info(f"deleted {expired} expired subscribers from {self.filename}")
+            for address, last_hello in connection.execute("SELECT address, last_hello FROM subscribers"):
+                subscribers.add(_subscriber(json.loads(address), last_hello))
+        except (sqlite3.Error, json.JSONDecodeError) as err:
+            logger.warning(f"failed to load subscribers from {self.filename}: {err}")
+        return subscribers
+
+    def save(self, subscribers: Set[ClockSubscriber], changes: Dict[ClockSubscriber, str]):
+        """ Applies the changes since the previous save in a single transaction.
+
+        Args:
+            subscribers (Set[ClockSubscriber]): all current subscribers
+            changes (Dict[ClockSubscriber, str]): the subscribers added or renewed (ADD)
+                or discarded (DISCARD) since the previous save
+        """
+        added = []
+        discarded = []
+        for subscriber, action in changes.items():
+            address = json.dumps(list(subscriber.address))
+            if action == ADD:
+                added.append((address, _timestamp(subscriber.last_hello)))
+            else:
+                discarded.append((address,))
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('dead_interval', ?)",
+                                   (self.dead_interval,))
+                connection.executemany("INSERT OR REPLACE INTO subscribers (address, last_hello) VALUES (?, ?)", added)
+                connection.executemany("DELETE FROM subscribers WHERE address = ?", discarded)
+            logger.debug(f"stored {len(added)} and deleted {len(discarded)} subscribers in {self.filename}")
+        except sqlite3.Error as err:
+            logger.warning(f"failed to save subscribers to {self.filename}: {err}")
+
+    def close(self):
+        """ Closes the database """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+STORAGE_FORMATS = {
+    "json": JsonStorage,
+    "journal": JournalStorage,
+    "sqlite": SqliteStorage,
+}
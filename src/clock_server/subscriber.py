@@ -1,22 +1,53 @@
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from socket import socket as Socket
-from typing import ByteString
+from typing import ByteString, Optional
 
+from clock_protocol.log import Hex, SampledLogger
 
 logger = logging.getLogger(__name__)
+packet_logger = SampledLogger(logger)
 
 class ClockSubscriber:
-    """ A client that has subscribed for date and time updates """
+    """ A client that has subscribed for date and time updates.
+        A subscriber is either a detached object, or a thin view of a slot in the
+        server's SubscriberTable, from which it reads the time of the last HELLO.
+    """
 
-    def __init__(self, address: tuple):
+    __slots__ = ("address", "_table", "_slot", "_last_hello")
+
+    def __init__(self, address: tuple, table=None, slot: int = None):
         """ Initializes a subscriber instance.
 
         Args:
             address (tuple): a 2-tuple consisting of an IP adddress (str) and port (int)
+            table (SubscriberTable, optional): the table that holds this subscriber
+            slot (int, optional): this subscriber's slot in the table
         """
         self.address = address
-        self.last_hello: datetime = None
+        self._table = table
+        self._slot = slot
+        self._last_hello: Optional[datetime] = None
+
+    @property
+    def last_hello(self) -> Optional[datetime]:
+        """ Gets the date and time of the last HELLO received from this subscriber; None if unknown """
+        if self._table is None:
+            return self._last_hello
+        if self._table.slot(self.address) != self._slot:
+            return None     # the subscriber has been removed from the table
+        timestamp = self._table.last_hello(self._slot)
+        if timestamp is None:
+            return None
+        return datetime.now() - timedelta(seconds=time.monotonic() - timestamp)
+
+    @last_hello.setter
+    def last_hello(self, value: Optional[datetime]):
+        """ Sets the date and time of the last HELLO of a detached subscriber """
+        if self._table is not None:
+            raise AttributeError("last_hello of a table view is set through the table")
+        self._last_hello = value
         
     def send(self, socket: Socket, message: ByteString):
         """ Sends a message to this subscriber
@@ -27,7 +58,7 @@ class ClockSubscriber:
         """
         try:
             socket.sendto(message, self.address)
-            logger.debug(f"sent message to subscriber {self.address}: {message.hex()}")
+            packet_logger.debug("sent message to subscriber %s: %s", self.address, Hex(message))
         except OSError as err:
             logger.error(f"error sending message to subscriber {self.address}: {err}")
 
@@ -43,7 +74,7 @@ class ClockSubscriber:
         """ Compares this subscriber to another for logical equality.
             Two different subscriber objects are considered logically equal if they have the same address.
         """
-        return self is other or (other, ClockSubscriber) and self.address == other.address
+        return self is other or isinstance(other, ClockSubscriber) and self.address == other.address
     
     def __hash__(self):
         """ Produces a hash code for this subscriber.
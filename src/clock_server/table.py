@@ -0,0 +1,197 @@
+import socket
+import sys
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .subscriber import ClockSubscriber
+
+# Each slot holds a complete C socket address, so that the fan-out engine can hand the
+# table's memory to the kernel as is; the record size is that of `struct sockaddr_in6`,
+# which is large enough for a `struct sockaddr_in`.
+SOCKADDR_SIZE = 28
+
+DEFAULT_CAPACITY = 1024
+
+# Last-HELLO timestamp of a subscriber that hasn't sent a HELLO since it was restored
+UNKNOWN = 0.0
+
+
+def pack_sockaddr(address: tuple) -> bytes:
+    """ Encodes a numeric address tuple as a C `sockaddr_in` or `sockaddr_in6` structure.
+
+    Args:
+        address (tuple): a 2-tuple of IPv4 address and port, or a 2- or 4-tuple
+            of IPv6 address, port, flow info and scope ID
+
+    Returns:
+        bytes: the encoded socket address
+
+    Raises:
+        OSError: if the address isn't a numeric IPv4 or IPv6 address
+    """
+    ip, port = address[0], address[1]
+    try:
+        return (int(socket.AF_INET).to_bytes(2, sys.byteorder) + port.to_bytes(2, "big")
+                + socket.inet_pton(socket.AF_INET, ip) + bytes(8))
+    except OSError:
+        pass
+    flowinfo = address[2] if len(address) > 2 else 0
+    scope_id = address[3] if len(address) > 3 else 0
+    return (int(socket.AF_INET6).to_bytes(2, sys.byteorder) + port.to_bytes(2, "big")
+            + flowinfo.to_bytes(4, "big") + socket.inet_pton(socket.AF_INET6, ip)
+            + scope_id.to_bytes(4, sys.byteorder))
+
+
+class PackedAddresses:
+    """ A consistent snapshot of the subscriber table, in the form used by the fan-out engine """
+
+    __slots__ = ("addresses", "slots", "sockaddrs", "namelens")
+
+    def __init__(self, addresses: List[tuple], slots: List[int], sockaddrs: bytes, namelens: bytes):
+        """ Initializes a snapshot.
+
+        Args:
+            addresses (List[tuple]): the address of each live subscriber
+            slots (List[int]): the slot of each live subscriber, in the same order
+            sockaddrs (bytes): the table's socket address records, SOCKADDR_SIZE octets per slot
+            namelens (bytes): the length of the socket address in each slot
+        """
+        self.addresses = addresses
+        self.slots = slots
+        self.sockaddrs = sockaddrs
+        self.namelens = namelens
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self.addresses)
+
+
+class SubscriberTable:
+    """ A compact table of subscribers.
+        Socket addresses (packed IP address and port), monotonic last-HELLO timestamps and
+        the monotonic time of the last HELLO written to the repository are stored in
+        parallel arrays indexed by slot number, and a dictionary maps each
+        subscriber address to its slot (the address tuples are shared with a slot-indexed
+        list for the reverse lookup). Slots of removed subscribers are reused.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """ Initializes an empty table.
+
+        Args:
+            capacity (int, optional): initial number of slots. Defaults to DEFAULT_CAPACITY.
+        """
+        capacity = max(1, capacity)
+        self._sockaddrs = bytearray(capacity * SOCKADDR_SIZE)
+        self._namelens = bytearray(capacity)        # zero for a free slot
+        self._last_hello = array("d", bytes(8 * capacity))
+        self._persisted = array("d", bytes(8 * capacity))
+        self._addresses: List[Optional[tuple]] = [None] * capacity
+        self._index: Dict[tuple, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, address: tuple) -> bool:
+        return address in self._index
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self._index)
+
+    def _grow(self):
+        capacity = len(self._namelens)
+        self._sockaddrs.extend(bytes(capacity * SOCKADDR_SIZE))
+        self._namelens.extend(bytes(capacity))
+        self._last_hello.extend(array("d", bytes(8 * capacity)))
+        self._persisted.extend(array("d", bytes(8 * capacity)))
+        self._addresses.extend([None] * capacity)
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def slot(self, address: tuple) -> Optional[int]:
+        """ Gets the slot of the subscriber with the given address, or None if there is none """
+        return self._index.get(address)
+
+    def add(self, address: tuple, last_hello: Optional[float]) -> Tuple[int, bool]:
+        """ Adds a subscriber, or updates the last-HELLO time of an existing subscriber.
+            A subscriber that is added is assumed to be stored with the given last-HELLO
+            time (see `persisted`).
+
+        Args:
+            address (tuple): the subscriber's address
+            last_hello (float): monotonic time of the subscriber's last HELLO; None if unknown
+
+        Returns:
+            Tuple[int, bool]: the subscriber's slot and a flag that is True if it was added
+
+        Raises:
+            OSError: if the address isn't a numeric IPv4 or IPv6 address
+        """
+        timestamp = UNKNOWN if last_hello is None else last_hello
+        slot = self._index.get(address)
+        if slot is not None:
+            self._last_hello[slot] = timestamp
+            return slot, False
+
+        sockaddr = pack_sockaddr(address)
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        offset = slot * SOCKADDR_SIZE
+        self._sockaddrs[offset:offset + len(sockaddr)] = sockaddr
+        self._namelens[slot] = len(sockaddr)
+        self._last_hello[slot] = timestamp
+        self._persisted[slot] = timestamp
+        self._addresses[slot] = address
+        self._index[address] = slot
+        return slot, True
+
+    def touch(self, slot: int, last_hello: float):
+        """ Sets the monotonic last-HELLO time of the subscriber in the given slot """
+        self._last_hello[slot] = last_hello
+
+    def last_hello(self, slot: int) -> Optional[float]:
+        """ Gets the monotonic last-HELLO time of the subscriber in the given slot; None if unknown """
+        timestamp = self._last_hello[slot]
+        return None if timestamp == UNKNOWN else timestamp
+
+    def persisted(self, slot: int) -> float:
+        """ Gets the monotonic last-HELLO time last written to the repository for the
+            subscriber in the given slot; UNKNOWN if it has never been written
+        """
+        return self._persisted[slot]
+
+    def set_persisted(self, slot: int, last_hello: float):
+        """ Records that the given last-HELLO time of the subscriber in a slot was written to the repository """
+        self._persisted[slot] = last_hello
+
+    def address(self, slot: int) -> tuple:
+        """ Gets the address of the subscriber in the given slot """
+        return self._addresses[slot]
+
+    def remove(self, slot: int) -> tuple:
+        """ Removes the subscriber in the given slot.
+
+        Returns:
+            tuple: the address of the removed subscriber
+        """
+        address = self._addresses[slot]
+        del self._index[address]
+        self._addresses[slot] = None
+        self._namelens[slot] = 0
+        self._last_hello[slot] = UNKNOWN
+        self._persisted[slot] = UNKNOWN
+        self._free.append(slot)
+        return address
+
+    def view(self, slot: int) -> ClockSubscriber:
+        """ Produces a subscriber object that is a view of the given slot """
+        return ClockSubscriber(self.address(slot), self, slot)
+
+    def snapshot(self) -> PackedAddresses:
+        """ Takes a snapshot of the live subscribers for a broadcast """
+        return PackedAddresses(list(self._index), list(self._index.values()),
+                               bytes(self._sockaddrs), bytes(self._namelens))
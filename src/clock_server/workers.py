@@ -0,0 +1,217 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import time
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from clock_protocol import log
+
+from .fanout import FanoutEngine
+from .metrics import MetricsServer, Registry, instrument_repository, instrument_server
+from .repository import SubscriberRepository
+from .subscriber import ClockSubscriber
+
+logger = logging.getLogger(__name__)
+
+ADD = "add"
+DISCARD = "discard"
+QUEUE_TIMEOUT = 0.250
+JOIN_TIMEOUT = 5.0
+
+
+class ShardRepository:
+    """ The repository used by a worker process.
+        It exposes the same interface as SubscriberRepository, but instead of saving
+        subscribers itself it forwards each add/discard request to the coordinator,
+        which merges the requests of all workers into the persistent repository.
+        In return, the coordinator sends it the addresses that another worker has
+        taken over (see Coordinator).
+    """
+
+    def __init__(self, worker: int, requests: multiprocessing.Queue, releases: multiprocessing.Queue,
+                 subscribers: Iterable[ClockSubscriber]):
+        """ Initializes a shard repository.
+
+        Args:
+            worker (int): index of the worker that owns this shard
+            requests (Queue): queue on which requests are forwarded to the coordinator
+            releases (Queue): queue on which the coordinator sends the addresses that
+                another worker has taken over
+            subscribers (Iterable[ClockSubscriber]): the stored subscribers assigned to this shard
+        """
+        self.worker = worker
+        self._requests = requests
+        self._releases = releases
+        self._subscribers = list(subscribers)
+
+    def start(self) -> Set[ClockSubscriber]:
+        """ Gets the stored subscribers assigned to this shard """
+        return set(self._subscribers)
+
+    def stop(self):
+        """ Nothing to do; the coordinator owns the persistent repository """
+
+    def add(self, subscriber: ClockSubscriber):
+        """ Forwards a request to add or renew a subscriber to the coordinator (without blocking).
+            The server calls this for each new subscriber, but for a renewal only when the
+            stored last-HELLO time has become stale (see ClockServer.update), so steady-state
+            renewals put nothing on the queue.
+        """
+        self._requests.put((ADD, self.worker, subscriber.address, subscriber.last_hello))
+
+    def discard(self, subscriber: ClockSubscriber):
+        """ Forwards a request to discard a subscriber to the coordinator (without blocking) """
+        self._requests.put((DISCARD, self.worker, subscriber.address))
+
+    def released(self) -> List[tuple]:
+        """ Gets the addresses (without blocking) that another worker has taken over since
+            the previous call; the server removes them without discarding them
+        """
+        addresses = []
+        while True:
+            try:
+                addresses.append(self._releases.get_nowait())
+            except queue.Empty:
+                return addresses
+
+
+def _run_worker(worker: int, server_class: type, server_args: tuple, fanout_args: tuple,
+                requests: multiprocessing.Queue, releases: multiprocessing.Queue,
+                subscribers: List[ClockSubscriber], log_args: tuple, metrics_args: tuple):
+    """ Entry point of a worker process """
+    log.configure(*log_args, format="%(asctime)s %(levelname)s %(processName)s %(threadName)s %(message)s")
+    repository = ShardRepository(worker, requests, releases, subscribers)
+    server = server_class(*server_args, repository, FanoutEngine(*fanout_args), reuse_port=True)
+    if metrics_args is not None:
+        # each worker serves its own metrics on the port after the coordinator's
+        metrics_ip, metrics_port, sample_rate = metrics_args
+        registry = Registry(sample_rate)
+        instrument_server(registry, server)
+        MetricsServer(registry, metrics_ip, metrics_port + 1 + worker).start()
+    logger.info(f"worker {worker} started with {len(subscribers)} stored subscribers (pid {os.getpid()})")
+    server.run()
+
+
+class Coordinator:
+    """ Runs a clock server as several worker processes bound to the same port.
+        The kernel spreads incoming HELLOs across the workers (SO_REUSEPORT), and each
+        worker broadcasts only to the subscribers it owns. The coordinator owns the
+        persistent SubscriberRepository and merges the add/discard requests of all
+        workers into it.
+
+        A stored subscriber is assigned to a shard when the server starts, but the kernel
+        may route its HELLOs to a different worker. An address is owned by the worker
+        that added it last: when another worker adds it, the coordinator tells the
+        previous owners to release their copies, which they remove (without discarding
+        them from the repository) before their next broadcast, so the subscriber doesn't
+        receive every broadcast twice. An address is discarded from the repository only
+        when no worker holds it any longer.
+    """
+
+    def __init__(self, workers: int, server_class: type, server_args: tuple, fanout_args: tuple,
+                 subscriber_repository: SubscriberRepository, metrics_args: tuple = None,
+                 log_args: tuple = ()):
+        """ Initializes a coordinator.
+
+        Args:
+            workers (int): number of worker processes
+            server_class (type): the server engine class to run in each worker
+            server_args (tuple): local IP, local port, dead interval and refresh interval
+            fanout_args (tuple): arguments for each worker's FanoutEngine
+            subscriber_repository (SubscriberRepository): the persistent repository
+            metrics_args (tuple, optional): IP address, port and sample rate for the metrics
+                endpoints; the coordinator serves the repository's metrics on the port, and
+                worker N serves its server's metrics on port + 1 + N. No metrics if not specified.
+            log_args (tuple, optional): the logging mode, rate limit and sample rate for
+                the workers (see clock_protocol.log.configure)
+        """
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("multiple workers require SO_REUSEPORT, which this platform does not support")
+        self.workers = workers
+        self.server_class = server_class
+        self.server_args = server_args
+        self.fanout_args = fanout_args
+        self.subscriber_repository = subscriber_repository
+        self.metrics_args = metrics_args
+        self.log_args = log_args
+        self._requests = multiprocessing.Queue()
+        self._releases = [multiprocessing.Queue() for _ in range(workers)]
+        self._owners: Dict[tuple, Set[int]] = {}
+        self._processes: List[multiprocessing.Process] = []
+
+    def _handle(self, action: str, worker: int, address: tuple, last_hello: datetime = None):
+        owners = self._owners.setdefault(address, set())
+        if action == ADD:
+            subscriber = ClockSubscriber(address)
+            subscriber.last_hello = last_hello
+            self.subscriber_repository.add(subscriber)
+            for owner in owners - {worker}:
+                # the kernel now routes the address's HELLOs to this worker
+                self._releases[owner].put(address)
+            owners.clear()
+            owners.add(worker)
+        elif action == DISCARD:
+            owners.discard(worker)
+            if not owners:
+                del self._owners[address]
+                self.subscriber_repository.discard(ClockSubscriber(address))
+
+    def _stop_workers(self):
+        """ Interrupts the workers (which may already have seen the interrupt) and waits
+            for them to exit, terminating any that don't exit in time.
+        """
+        for process in self._processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGINT)
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"terminating {process.name}")
+                process.terminate()
+                process.join()
+
+    def run(self):
+        """ Starts the workers and merges their requests until the program is interrupted """
+        if self.metrics_args is not None:
+            metrics_ip, metrics_port, sample_rate = self.metrics_args
+            registry = Registry(sample_rate)
+            instrument_repository(registry, self.subscriber_repository)
+            registry.gauge("owned_addresses", "Number of addresses held by at least one worker",
+                           lambda: len(self._owners))
+            MetricsServer(registry, metrics_ip, metrics_port).start()
+        shards = [[] for _ in range(self.workers)]
+        for i, subscriber in enumerate(sorted(self.subscriber_repository.start(), key=str)):
+            shards[i % self.workers].append(subscriber)
+            self._owners[subscriber.address] = {i % self.workers}
+
+        for worker, shard in enumerate(shards):
+            process = multiprocessing.Process(
+                target=_run_worker, name=f"worker-{worker}",
+                args=(worker, self.server_class, self.server_args, self.fanout_args,
+                      self._requests, self._releases[worker], shard, self.log_args, self.metrics_args))
+            process.start()
+            self._processes.append(process)
+        logger.info(f"started {self.workers} workers")
+
+        try:
+            while any(process.is_alive() for process in self._processes):
+                try:
+                    self._handle(*self._requests.get(timeout=QUEUE_TIMEOUT))
+                except queue.Empty:
+                    pass
+        except KeyboardInterrupt:
+            pass
+
+        self._stop_workers()
+        while True:
+            try:
+                self._handle(*self._requests.get_nowait())
+            except queue.Empty:
+                break
+        self.subscriber_repository.stop()
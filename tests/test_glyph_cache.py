@@ -0,0 +1,52 @@
+""" Tests of the LED glyph cache: which displays share glyphs, and the pixel format the
+    glyphs are rendered in. Skipped if pygame isn't installed.
+
+    Run from the base directory of the project: python3 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+if pygame is not None:
+    from clock_client.ui.led import GLYPHS, Display7Segment, Display14Segment, GlyphCache
+
+
+@unittest.skipIf(pygame is None, "pygame is not installed")
+class GlyphCacheTest(unittest.TestCase):
+
+    def test_display_uses_the_cache_it_is_given(self):
+        surface = pygame.Surface((200, 200))
+        glyphs = GlyphCache()
+        shared = len(GLYPHS)
+        Display7Segment(surface, (0, 0), 5, "red", glyphs=glyphs)
+        Display14Segment(surface, (0, 100), 5, "red", glyphs=glyphs)
+        self.assertEqual(len(glyphs), 2)
+        self.assertEqual(len(GLYPHS), shared)
+
+    def test_displays_of_the_same_format_share_glyphs(self):
+        glyphs = GlyphCache()
+        first = glyphs.glyphs(Display7Segment, 5, "red", pygame.Surface((10, 10), 0, 32))
+        second = glyphs.glyphs(Display7Segment, 5, "red", pygame.Surface((20, 20), 0, 32))
+        self.assertIs(first, second)
+        self.assertEqual(len(glyphs), 1)
+
+    def test_glyphs_are_rendered_in_each_surface_format(self):
+        glyphs = GlyphCache()
+        for surface in (pygame.Surface((10, 10), 0, 16), pygame.Surface((10, 10), 0, 32),
+                        pygame.Surface((10, 10), pygame.SRCALPHA, 32)):
+            glyph = glyphs.glyphs(Display7Segment, 5, "red", surface)[0]
+            self.assertEqual(glyph.get_bitsize(), surface.get_bitsize())
+            self.assertEqual(glyph.get_masks(), surface.get_masks())
+            self.assertEqual(glyph.get_flags() & pygame.SRCALPHA, surface.get_flags() & pygame.SRCALPHA)
+        self.assertEqual(len(glyphs), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
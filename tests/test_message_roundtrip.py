@@ -0,0 +1,113 @@
+""" Round-trip tests of the DATE, TIME and MICROSECOND encoding: the server's encoder,
+    the shared TLV decoder and the client's conversion to an Instant.
+
+    Run from the base directory of the project: python3 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from clock_client.chronometer import Chronometer
+from clock_client.client import ClockClient
+from clock_client.instant import Instant
+from clock_protocol.tlv import DateField, HelloField, MicrosecondField, TimeField, read_fields
+from clock_server.message import MessageBuilder, encode_datetime
+
+SAMPLES = (
+    datetime(2000, 1, 1, 0, 0, 0, 0),
+    datetime(2024, 2, 29, 12, 34, 56, 789012),
+    datetime(2026, 10, 17, 9, 5, 7, 450001),
+    datetime(2099, 12, 31, 23, 59, 59, 999999),
+    datetime(2100, 1, 1, 0, 0, 0, 9999),
+    datetime(2199, 12, 31, 23, 59, 59, 990000),
+)
+
+
+def expected_instant(dt: datetime, microsecond: int = None) -> Instant:
+    return Instant(dt.year, dt.month, dt.day, None, dt.hour, dt.minute, dt.second,
+                   dt.microsecond if microsecond is None else microsecond)
+
+
+class MessageRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = ClockClient("127.0.0.1", 0, "127.0.0.1", 0, Chronometer(lazy=True))
+
+    def tearDown(self):
+        self.client._loop.close()
+
+    def decode(self, data: bytes):
+        """ Decodes a message into its DATE, TIME and MICROSECOND fields (None if absent) """
+        fields = {type(field): field for field in read_fields(data)}
+        micro = fields.get(MicrosecondField)
+        return fields.get(DateField), fields.get(TimeField), micro.microsecond if micro else None
+
+    def test_encode_datetime_fields(self):
+        for dt in SAMPLES:
+            with self.subTest(dt=dt):
+                date, time, microsecond = self.decode(encode_datetime(dt))
+                self.assertEqual(date, DateField(dt.year, dt.month, dt.day, dt.weekday()))
+                self.assertEqual(time, TimeField(dt.hour, dt.minute, dt.second, dt.microsecond // 10000))
+                self.assertEqual(microsecond, dt.microsecond)
+
+    def test_message_builder(self):
+        dt = SAMPLES[1]
+        builder = MessageBuilder()
+        builder.append_hello(120)
+        builder.append_date(dt)
+        builder.append_time(dt)
+        builder.append_microsecond(dt)
+        fields = list(read_fields(builder.to_bytes()))
+        self.assertEqual(fields, [HelloField(120), DateField(2024, 2, 29, 3), TimeField(12, 34, 56, 78),
+                                  MicrosecondField(789012)])
+
+        builder = MessageBuilder()
+        builder.append_datetime(dt)
+        self.assertEqual(builder.to_bytes(), encode_datetime(dt))
+
+    def test_decode_instant(self):
+        for dt in SAMPLES:
+            with self.subTest(dt=dt):
+                date, time, microsecond = self.decode(encode_datetime(dt))
+                self.assertEqual(self.client._decode_instant(date, time, microsecond), expected_instant(dt))
+
+    def test_decode_instant_without_microsecond(self):
+        # a server that sends only DATE and TIME still gives centisecond precision
+        for dt in SAMPLES:
+            with self.subTest(dt=dt):
+                date, time, _ = self.decode(encode_datetime(dt))
+                self.assertEqual(self.client._decode_instant(date, time),
+                                 expected_instant(dt, dt.microsecond // 10000 * 10000))
+
+    def test_decode_instant_inconsistent_microsecond(self):
+        # a MICROSECOND field that disagrees with the TIME field's hundredths is ignored
+        dt = SAMPLES[2]
+        date, time, microsecond = self.decode(encode_datetime(dt))
+        self.assertEqual(self.client._decode_instant(date, time, (microsecond + 20000) % 1000000),
+                         expected_instant(dt, 450000))
+
+    def test_bcd_boundaries(self):
+        data = encode_datetime(datetime(2099, 12, 31, 23, 59, 59, 999999))
+        # DATE: flags (century bit clear, Thursday), 99, 12, 31; TIME: 23, 59, 59, 99
+        self.assertEqual(data[:10], bytes.fromhex("14" "03991231" "24" "23595999"))
+        self.assertEqual(data[10:], bytes.fromhex("33" "0f423f"))
+
+    def test_century_bit(self):
+        data = encode_datetime(datetime(2100, 1, 1))
+        self.assertEqual(data[1], 1 << 3 | datetime(2100, 1, 1).weekday())
+        date, _, _ = self.decode(data)
+        self.assertEqual(date.year, 2100)
+
+    def test_invalid_microsecond_field(self):
+        for data in (bytes.fromhex("33" "0f4240"), bytes.fromhex("32" "0000")):
+            with self.subTest(data=data.hex()):
+                with self.assertRaises(ValueError):
+                    list(read_fields(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
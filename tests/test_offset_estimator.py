@@ -0,0 +1,51 @@
+""" Tests of the client's server time estimate when the local monotonic clock drifts.
+
+    Run from the base directory of the project: python3 -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from clock_client.sync import OffsetEstimator
+
+# 2026-01-01 00:00:00 in microseconds since the epoch
+SERVER_START = 1767225600000000
+REFRESH_SECONDS = 30
+DELAY_US = 2000
+
+
+class OffsetEstimatorTest(unittest.TestCase):
+
+    def errors(self, drift: float, frequency: float = None, samples: int = 40) -> list:
+        """ Feeds an estimator a server time every refresh interval, received after a fixed
+            delay by a local clock that runs `drift` seconds per second fast, and returns
+            the error of each estimate in microseconds
+        """
+        estimator = OffsetEstimator()
+        estimator.add_round_trip(0, 2 * DELAY_US * 1000)
+        errors = []
+        for i in range(samples):
+            server_ticks = SERVER_START + i * REFRESH_SECONDS * 1000000
+            received_ns = round((i * REFRESH_SECONDS * 1000000 + DELAY_US) * (1 + drift) * 1000)
+            ticks = estimator.add_time(server_ticks, received_ns, frequency)
+            errors.append(ticks - (server_ticks + DELAY_US))
+        return errors
+
+    def test_no_drift(self):
+        self.assertTrue(all(abs(error) <= 1 for error in self.errors(0.0)))
+
+    def test_fast_clock_does_not_favour_old_samples(self):
+        for drift in (100e-6, -100e-6, 400e-6):
+            with self.subTest(drift=drift):
+                self.assertLess(max(abs(error) for error in self.errors(drift)), 1000)
+
+    def test_measured_frequency(self):
+        for drift in (100e-6, -100e-6):
+            with self.subTest(drift=drift):
+                self.assertLess(max(abs(error) for error in self.errors(drift, -drift)), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+""" Tests of when the subscriber repository saves: changes to the set of subscribers are
+    saved within the flush interval, renewals alone within the storage's renewal interval.
+
+    Run from the base directory of the project: python3 -m unittest discover tests
+"""
+import os
+import sys
+import time
+import unittest
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from clock_server.repository import SubscriberRepository
+from clock_server.storage import ADD, DISCARD
+from clock_server.subscriber import ClockSubscriber
+
+FLUSH_INTERVAL = 0.05
+# long enough for the repository to have flushed, if it was going to
+SETTLE = 0.3
+
+
+class RecordingStorage:
+    """ A storage backend that records the changes of each save """
+
+    def __init__(self, renewal_interval: float):
+        self.renewal_interval = renewal_interval
+        self.saves = []
+
+    def load(self):
+        return set()
+
+    def save(self, subscribers, changes):
+        self.saves.append({subscriber.address: action for subscriber, action in changes.items()})
+
+    def close(self):
+        pass
+
+
+def subscriber(port: int, seconds_ago: float = 0.0) -> ClockSubscriber:
+    subscriber = ClockSubscriber(("127.0.0.1", port))
+    subscriber.last_hello = datetime.now() - timedelta(seconds=seconds_ago)
+    return subscriber
+
+
+class SubscriberRepositoryTest(unittest.TestCase):
+
+    def start(self, renewal_interval: float) -> RecordingStorage:
+        storage = RecordingStorage(renewal_interval)
+        self.repository = SubscriberRepository("unused", FLUSH_INTERVAL, storage)
+        self.repository.start()
+        self.addCleanup(self.repository.stop)
+        return storage
+
+    def test_renewals_wait_for_the_renewal_interval(self):
+        storage = self.start(renewal_interval=60.0)
+        self.repository.add(subscriber(1000, 10))
+        time.sleep(SETTLE)
+        self.assertEqual(storage.saves, [{("127.0.0.1", 1000): ADD}])
+        self.repository.add(subscriber(1000))
+        time.sleep(SETTLE)
+        self.assertEqual(len(storage.saves), 1)
+
+    def test_renewals_are_saved_with_other_changes(self):
+        storage = self.start(renewal_interval=60.0)
+        self.repository.add(subscriber(1000, 10))
+        self.repository.add(subscriber(1001, 10))
+        time.sleep(SETTLE)
+        self.repository.add(subscriber(1000))
+        self.repository.discard(subscriber(1001))
+        time.sleep(SETTLE)
+        self.assertEqual(storage.saves[-1], {("127.0.0.1", 1000): ADD, ("127.0.0.1", 1001): DISCARD})
+
+    def test_renewals_are_saved_at_every_flush_without_a_renewal_interval(self):
+        storage = self.start(renewal_interval=0.0)
+        self.repository.add(subscriber(1000, 10))
+        time.sleep(SETTLE)
+        self.repository.add(subscriber(1000))
+        time.sleep(SETTLE)
+        self.assertEqual(len(storage.saves), 2)
+
+    def test_stop_saves_pending_renewals(self):
+        storage = self.start(renewal_interval=60.0)
+        self.repository.add(subscriber(1000, 10))
+        time.sleep(SETTLE)
+        self.repository.add(subscriber(1000))
+        self.repository.stop()
+        self.assertEqual(len(storage.saves), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
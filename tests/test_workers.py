@@ -0,0 +1,80 @@
+""" Tests of the ownership of subscriber addresses in multi-process worker mode: when the
+    kernel routes a stored subscriber's HELLOs to another worker than the one it was
+    restored to, the restored copy is released.
+
+    Run from the base directory of the project: python3 -m unittest discover tests
+"""
+import os
+import queue
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from clock_server.server import ClockServer
+from clock_server.workers import ADD, Coordinator, ShardRepository
+
+ADDRESS = ("127.0.0.1", 1000)
+
+
+class RecordingRepository:
+    """ A persistent repository that records the requests it is given """
+
+    def __init__(self):
+        self.requests = []
+
+    def add(self, subscriber):
+        self.requests.append((ADD, subscriber.address))
+
+    def discard(self, subscriber):
+        self.requests.append(("discard", subscriber.address))
+
+
+class CoordinatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = RecordingRepository()
+        self.coordinator = Coordinator(2, ClockServer, (), (), self.repository)
+
+    def tearDown(self):
+        for releases in self.coordinator._releases:
+            releases.close()
+        self.coordinator._requests.close()
+
+    def test_adding_worker_takes_over_a_restored_address(self):
+        self.coordinator._owners[ADDRESS] = {0}
+        self.coordinator._handle(ADD, 1, ADDRESS)
+        self.assertEqual(self.coordinator._owners[ADDRESS], {1})
+        self.assertEqual(self.coordinator._releases[0].get(timeout=5), ADDRESS)
+        self.assertTrue(self.coordinator._releases[1].empty())
+
+    def test_renewal_releases_nothing(self):
+        self.coordinator._handle(ADD, 0, ADDRESS)
+        self.coordinator._handle(ADD, 0, ADDRESS)
+        self.assertEqual(self.coordinator._owners[ADDRESS], {0})
+        self.assertTrue(all(releases.empty() for releases in self.coordinator._releases))
+
+    def test_released_copy_does_not_discard_the_address(self):
+        self.coordinator._owners[ADDRESS] = {0}
+        self.coordinator._handle(ADD, 1, ADDRESS)
+        # the previous owner's copy expires before it sees the release
+        self.coordinator._handle("discard", 0, ADDRESS)
+        self.assertEqual(self.coordinator._owners[ADDRESS], {1})
+        self.assertEqual(self.repository.requests, [(ADD, ADDRESS)])
+
+
+class ShardReleaseTest(unittest.TestCase):
+
+    def test_server_removes_released_address_without_discarding_it(self):
+        requests, releases = queue.Queue(), queue.Queue()
+        server = ClockServer("127.0.0.1", 0, 120, 30, ShardRepository(0, requests, releases, []))
+        server.update(ADDRESS)
+        server.update(("127.0.0.1", 1001))
+        releases.put(ADDRESS)
+        self.assertEqual(list(server.expire()), [("127.0.0.1", 1001)])
+        self.assertEqual(server.subscriber_count, 1)
+        self.assertEqual([request[0] for request in requests.queue], [ADD, ADD])
+
+
+if __name__ == "__main__":
+    unittest.main()